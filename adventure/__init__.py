@@ -9,39 +9,87 @@ import sys
 if sys.version_info <= (3,):
     raise RuntimeError('Alas, Adventure requires Python 3 or later')
 
+__version__ = '1.6'
+
+_world = None
+_words = None  # the words of the game at the prompt, once there is one
+
+def load_world():
+    """Return the read-only world that every game in this process shares.
+
+    Its longer text stays in a memory map of ``advent.dat``, which the
+    operating system shares between processes, until first displayed.
+
+    """
+    global _world
+
+    if _world is None:
+        import os
+        from .cache import load
+
+        _world = load(os.path.join(os.path.dirname(__file__), 'advent.dat'),
+                      lazy=True)
+    return _world
+
 def load_advent_dat(data):
-    import os
-    from .data import parse
+    """Fill a ``Data`` object from ``advent.dat``, or attach a ``Game``."""
+    from .data import Data
+
+    if isinstance(data, Data):
+        import os
+        from .cache import load
+
+        datapath = os.path.join(os.path.dirname(__file__), 'advent.dat')
+        data.__dict__.update(load(datapath).__dict__)
+    else:
+        data.attach(load_world())
 
-    datapath = os.path.join(os.path.dirname(__file__), 'advent.dat')
-    with open(datapath, 'r', encoding='ascii') as datafile:
-        parse(data, datafile)
+def new_game(seed=None):
+    """Return a game that is waiting to ask whether they want instructions."""
+    from .game import Game
+
+    game = Game(seed)
+    game.attach(load_world())
+    game.start()
+    return game
 
-def play(seed=None):
+def play(seed=None, namespace=None):
     """Turn the Python prompt into an Adventure game.
 
     With optional the `seed` argument the caller can supply an integer
-    to start the Python random number generator at a known state.
+    to start the Python random number generator at a known state.  The
+    words of the game are defined in `namespace`, or by default in the
+    globals of the caller.
 
     """
-    global _game
+    global _game, _words
 
     from .game import Game
     from .prompt import install_words
 
     _game = Game(seed)
     load_advent_dat(_game)
-    install_words(_game)
+    _words = install_words(_game, namespace)
     _game.start()
     print(_game.output[:-1])
 
-def resume(savefile, quiet=False):
-    global _game
+def resume(savefile, quiet=False, namespace=None):
+    global _game, _words
 
     from .game import Game
     from .prompt import install_words
 
     _game = Game.resume(savefile)
-    install_words(_game)
+    _words = install_words(_game, namespace)
     if not quiet:
         print('GAME RESTORED\n')
+
+def __getattr__(name):
+    """Offer the words of the current game, as in ``adventure.look``."""
+    if _words is not None:
+        try:
+            return _words[name]
+        except KeyError:
+            pass
+    raise AttributeError('module {!r} has no attribute {!r}'
+                         .format(__name__, name))
@@ -4,49 +4,188 @@ Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
 Apache License, Version 2.0 as detailed in the accompanying README.txt.
 
 """
-import argparse
 import os
 import re
-import readline
 import sys
-from time import sleep
+import time
 from . import load_advent_dat
 from .game import Game
 
 BAUD = 1200
 
-def baudout(s):
-    out = sys.stdout
-    for c in s:
-        sleep(9. / BAUD)  # 8 bits + 1 stop bit @ the given baud rate
-        out.write(c)
-        out.flush()
+# Starting up is most of the work of a short game, so argparse and
+# readline are imported only by the sessions that use them.  Typing at a
+# baud rate, as the default of 1200 does, needs the asyncio terminal,
+# whose imports cost more than everything else here put together; so
+# the greeting is typed without it while a thread imports it.
 
-def loop(args):
+class Options(object):
+    """What the command line asked for; these are the defaults."""
+    savefile = None
+    baud = BAUD
+    scripts = None
+    seed = 0
+    transcripts = None
+
+def parse_args(args):
+    """Return the `Options` that the command line asks for.
+
+    Plain arguments are picked apart here; anything else, like
+    ``--help``, ``--script``, or a mistake, is left to argparse.
+
+    """
+    options = Options()
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == '--baud' and i + 1 < len(args) and args[i + 1].isdigit():
+            options.baud = int(args[i + 1])
+            i += 2
+        elif arg.startswith('--baud=') and arg[7:].isdigit():
+            options.baud = int(arg[7:])
+            i += 1
+        elif options.savefile is None and not arg.startswith('-'):
+            options.savefile = arg
+            i += 1
+        else:
+            return parse_args_fully(args)
+    return options
+
+def parse_args_fully(args):
+    import argparse
     parser = argparse.ArgumentParser(
         description='Adventure into the Colossal Caves.',
         prog='{} -m adventure'.format(os.path.basename(sys.executable)))
     parser.add_argument(
         'savefile', nargs='?', help='The filename of game you have saved.')
-    args = parser.parse_args(args)
+    parser.add_argument(
+        '--baud', type=int, default=BAUD,
+        help='how fast to type output, or 0 for no delay'
+        ' (default %(default)s)')
+    parser.add_argument(
+        '--script', dest='scripts', action='append', metavar='FILE',
+        help='play the commands in FILE, or - for standard input, at full'
+        ' speed without a terminal; may be given more than once')
+    parser.add_argument(
+        '--seed', type=int, default=0,
+        help='random seed for each --script game (default %(default)s)')
+    parser.add_argument(
+        '--transcripts', metavar='DIRECTORY',
+        help='write --script transcripts to FILE-SEED.txt in DIRECTORY'
+        ' instead of standard output')
+    options = parser.parse_args(args, Options())
+    if options.savefile is not None and options.scripts:
+        parser.error('a savefile cannot be combined with --script')
+    return options
 
-    if args.savefile is None:
-        game = Game()
-        load_advent_dat(game)
-        game.start()
-        baudout(game.output)
-    else:
-        game = Game.resume(args.savefile)
-        baudout('GAME RESTORED\n')
+def run_scripts(paths, seed=0, transcripts=None, stdout=None, stderr=None):
+    """Play each script in `paths` headlessly, and report how each went.
+
+    Transcripts go to `stdout`, or to files in the `transcripts`
+    directory; the score, turns, and time of each script, and any
+    exception, go to `stderr`.  Returns 1 if any script failed, else 0.
+
+    """
+    from .replay import format_transcript, parse_script, read_script, replay
+
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    if transcripts:
+        os.makedirs(transcripts, exist_ok=True)
 
+    errors = 0
+    for path in paths:
+        if path == '-':
+            commands = parse_script(sys.stdin)
+        else:
+            commands = read_script(path)
+        result = replay(commands, seed, path)
+        text = format_transcript(result.transcript)
+        if transcripts:
+            name = '{}-{}.txt'.format(
+                'stdin' if path == '-' else os.path.basename(path), seed)
+            with open(os.path.join(transcripts, name), 'w') as f:
+                f.write(text)
+        else:
+            stdout.write(text)
+        stderr.write('{}: score {}/{} in {} turns, {:.1f} ms{}\n'.format(
+            path, result.score, result.max_score, result.turns,
+            result.elapsed * 1e3, ' FAILED' if result.error else ''))
+        if result.error:
+            errors += 1
+            stderr.write(result.error)
+    stdout.flush()
+    return 1 if errors else 0
+
+def play(game, greeting):
+    """Run `game` with output printed at once, starting with `greeting`."""
+    if sys.stdin.isatty():
+        import readline  # gives input() line editing
+    out = sys.stdout
+    out.write(greeting)
+    out.flush()
     while not game.is_finished:
         line = input('> ').lower()
         words = re.findall(r'\w+', line)
         if words:
-            baudout(game.do_command(words))
+            out.write(game.do_command(words))
+            out.flush()
+
+def type_greeting(text, baud, stdout=None):
+    """Type `text` at `baud` as the terminal does, but without asyncio.
+
+    Nothing can be typed ahead of the first question, so there is no
+    input to read yet; Control-C prints the rest of the text at once.
+
+    """
+    out = sys.stdout if stdout is None else stdout
+    chars_per_second = baud / 9.  # 8 bits + 1 stop bit
+    start = time.monotonic()
+    i = 0
+    try:
+        while i < len(text):
+            time.sleep(1 / 60.)
+            j = int((time.monotonic() - start) * chars_per_second)
+            if j > i:
+                out.write(text[i:j])
+                out.flush()
+                i = j
+    except KeyboardInterrupt:
+        pass
+    out.write(text[i:])
+    out.flush()
+
+def loop(args):
+    options = parse_args(args)
+    savefile = options.savefile
+    baud = options.baud
+
+    if options.scripts:
+        return run_scripts(options.scripts, options.seed, options.transcripts)
+
+    if savefile is None:
+        game = Game()
+        load_advent_dat(game)
+        game.start()
+        greeting = game.output
+    else:
+        game = Game.resume(savefile)
+        greeting = 'GAME RESTORED\n'
+
+    if baud:
+        import threading
+        from importlib import import_module
+        threading.Thread(target=import_module, args=('adventure.terminal',),
+                         daemon=True).start()
+        type_greeting(greeting, baud)
+        import asyncio
+        from .terminal import Terminal, play as type_game
+        asyncio.run(type_game(game, Terminal(baud), ''))
+    else:
+        play(game, greeting)
 
 if __name__ == '__main__':
     try:
-        loop(sys.argv[1:])
-    except EOFError:
+        sys.exit(loop(sys.argv[1:]))
+    except (EOFError, KeyboardInterrupt):
         pass
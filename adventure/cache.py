@@ -0,0 +1,105 @@
+"""Keep a compiled snapshot of the parsed ``advent.dat`` on disk.
+
+Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
+Apache License, Version 2.0 as detailed in the accompanying README.txt.
+
+"""
+import hashlib
+import io
+import os
+import pickle
+from .data import Data, DataFile, parse
+
+# The snapshot is a pickle of a freshly parsed `Data` object, preceded
+# by a header naming the exact data file and code that produced it.
+# The key covers the source of the modules that shape the pickled
+# objects, so editing them invalidates old snapshots; bump FORMAT if
+# some other change ever needs to do the same.  A lazy snapshot, whose
+# text still lives in the data file, is kept under its own name.
+
+MAGIC = b'ADVENTURE-WORLD\n'
+FORMAT = 1
+CACHE_NAME = 'advent.cache'
+LAZY_CACHE_NAME = 'advent-lazy.cache'
+
+def cache_key(raw, lazy=False):
+    """Return the key that a snapshot of the data file `raw` must carry."""
+    from . import __version__, data, model
+    h = hashlib.sha256(raw)
+    h.update('\n{}\n{}\n{}\n'.format(__version__, FORMAT, lazy)
+             .encode('ascii'))
+    for module in data, model:
+        try:
+            with open(module.__file__, 'rb') as f:
+                h.update(f.read())
+        except OSError:  # pragma: no cover
+            pass  # installed without source; rely on the version number
+    return h.hexdigest().encode('ascii')
+
+def cache_paths(datapath, name=CACHE_NAME):
+    """Return the places we try, in order, to keep a snapshot."""
+    home = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return [
+        os.path.join(os.path.dirname(os.path.abspath(datapath)), name),
+        os.path.join(home, 'python-adventure', name),
+        ]
+
+def read_snapshot(path, key):
+    """Return the `Data` pickled at `path`, or None if missing or stale."""
+    try:
+        with open(path, 'rb') as f:
+            if f.readline() != MAGIC or f.readline().rstrip(b'\n') != key:
+                return None
+            return pickle.load(f)
+    except Exception:
+        return None  # a missing, truncated, or foreign file is just stale
+
+def write_snapshot(path, key, data):
+    """Atomically save `data` to `path`, returning whether we succeeded."""
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC + key + b'\n')
+            pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+    return True
+
+def load(datapath, lazy=False):
+    """Return a `Data` for `datapath`, parsing it only if no snapshot is fresh.
+
+    A freshly parsed file is saved back to the first cache location
+    that is writable, so that the next process can skip the parse.
+    If `lazy`, most text is read from a memory map of `datapath` only
+    when first needed, so the file must stay where it is.
+
+    """
+    with open(datapath, 'rb') as f:
+        raw = f.read()
+    key = cache_key(raw, lazy)
+    paths = cache_paths(datapath, LAZY_CACHE_NAME if lazy else CACHE_NAME)
+
+    for path in paths:
+        data = read_snapshot(path, key)
+        if data is not None:
+            if lazy:  # a snapshot might be shared by identical copies
+                data.source.path = os.path.abspath(datapath)
+            return data
+
+    data = Data()
+    if lazy:
+        parse(data, DataFile(datapath))
+    else:
+        parse(data, io.StringIO(raw.decode('ascii'), newline=None))
+
+    for path in paths:
+        if write_snapshot(path, key, data):
+            break
+    return data
@@ -6,6 +6,9 @@ Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
 Apache License, Version 2.0 as detailed in the accompanying README.txt.
 
 """
+import mmap
+import os
+from array import array
 from operator import attrgetter
 from .model import Hint, Message, Move, Object, Room, Word
 
@@ -36,11 +39,114 @@ class Data(object):
         self.class_messages = []
         self.hints = {}
         self.magic_messages = {}
+        self.source = None  # a `DataFile`, if text is read lazily
 
     def referent(self, word):
         if word.kind == 'noun':
             return self.objects[word.n % 1000]
 
+    def add_line(self, target, key, fields):
+        """Add a line of text to the attribute `key` of `target`.
+
+        An integer `key` names one of the object's messages instead.
+        The text is assembled once parsing is done; `fields` of None
+        just makes sure that the text exists, even if it stays empty.
+
+        """
+        # Keyed by identity, since game objects cannot be hashed.
+        lines = self._lines.setdefault((id(target), key), (target, []))[1]
+        if fields is None:
+            return
+        if self.source is None:
+            lines.append(expand_tabs(fields) + '\n')
+            return
+        start, end = self.source.span
+        if lines and lines[-1][1] == start:  # the usual adjacent line
+            start = lines.pop()[0]
+        lines.append((start, end))
+
+class DataFile(object):
+    """The ``advent.dat`` file, memory-mapped so text is read on demand.
+
+    Parsing reads lines through `readline()`, which remembers where the
+    most recent line lies, so that bulky text can be left in the file.
+    Each such record is listed in `offsets` as a start and an end, and
+    is then stood for by a small `LazyText` naming its place in that
+    list.  The map is shared between processes by the operating system,
+    and is opened again after unpickling.
+
+    """
+    def __init__(self, path, offsets=b''):
+        self.path = os.path.abspath(path)
+        self.offsets = array('L', offsets)
+        self.span = None
+        self._map = None
+
+    def __getstate__(self):
+        return {'path': self.path, 'offsets': self.offsets.tobytes()}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['offsets'])
+
+    @property
+    def map(self):
+        if self._map is None:
+            with open(self.path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def readline(self):
+        """Return the next line, remembering where it lies in the file."""
+        m = self.map
+        start = m.tell()
+        line = m.readline()
+        self.span = (start, m.tell())
+        return line.decode('ascii')
+
+    def lazy_text(self, spans):
+        """Return a `LazyText` for the lines at `spans` in the file."""
+        if len(spans) > 1:  # lines not adjacent, so just read them now
+            return self.text(spans)
+        self.offsets.extend(spans[0])
+        return LazyText(self, len(self.offsets) // 2 - 1)
+
+    def text(self, spans):
+        """Return the text of the records that lie at `spans` in the file."""
+        m = self.map
+        lines = []
+        for start, end in spans:
+            for line in m[start:end].decode('ascii').splitlines():
+                fields = line.strip().split('\t')[1:]
+                if not fields[0].startswith('>$<'):
+                    lines.append(expand_tabs(fields) + '\n')
+        return ''.join(lines)
+
+class LazyText(object):
+    """Text that stays in the data file until someone first asks for it."""
+
+    __slots__ = ('source', 'i')
+
+    def __init__(self, source, i):
+        self.source = source
+        self.i = i
+
+    def __reduce__(self):
+        return LazyText, (self.source, self.i)
+
+    def __str__(self):
+        offsets = self.source.offsets
+        i = 2 * self.i
+        return self.source.text([(offsets[i], offsets[i + 1])])
+
+class LazyTexts(dict):
+    """An object's messages, each read from the data file when first used."""
+
+    def __getitem__(self, key):
+        text = dict.__getitem__(self, key)
+        if not isinstance(text, str):
+            text = self[key] = str(text)
+        return text
+
 # Helper functions.
 
 def make_object(dictionary, klass, n):
@@ -50,12 +156,13 @@ def make_object(dictionary, klass, n):
     return dictionary[n]
 
 def expand_tabs(segments):
+    """Rejoin a line's text, upper-casing it so the game can print it as-is."""
     it = iter(segments)
     line = next(it)
     for segment in it:
         spaces = 8 - len(line) % 8
         line += ' ' * spaces + segment
-    return line
+    return line.upper()
 
 def accumulate_message(dictionary, n, line):
     dictionary[n] = dictionary.get(n, '') + line + '\n'
@@ -72,7 +179,7 @@ def section1(data, n, *etc):
     """
     room = make_object(data.rooms, Room, n)
     if not etc[0].startswith('>$<'):
-        room.long_description += expand_tabs(etc) + '\n'
+        data.add_line(room, 'long_description', etc)
 
 def section2(data, n, line):
     """Handle record from “Section 2: short form descriptions”.
@@ -226,12 +333,9 @@ def section5(data, n, *etc):
         data._object.inventory_message = expand_tabs(etc)
     else:
         n //= 100
-        messages = data._object.messages
         if etc[0].startswith('>$<'):
-            more = ''
-        else:
-            more = expand_tabs(etc) + '\n'
-        messages[n] = messages.get(n, '') + more
+            etc = None
+        data.add_line(data._object, n, etc)
 
 def section6(data, n, *etc):
     """Handle record from “Section 6: arbitrary messages”.
@@ -242,7 +346,7 @@ def section6(data, n, *etc):
 
     """
     message = make_object(data.messages, Message, n)
-    message.text += expand_tabs(etc) + '\n'
+    data.add_line(message, 'text', etc)
 
 def section7(data, n, room_n, fixed=None):
     """Handle record from “Section 7: object locations”.
@@ -263,7 +367,7 @@ def section7(data, n, room_n, fixed=None):
             obj.is_fixed = True
         else:
             room2 = make_object(data.rooms, Room, fixed)
-            obj.rooms.append(room2)  # exists two places, like grate
+            obj.rooms += (room2,)  # exists two places, like grate
     obj.starting_rooms = list(obj.rooms)  # remember where things started
 
 def section8(data, word_n, message_n):
@@ -372,8 +476,17 @@ def section12(data, n, line):
 # Process every section of the file in turn.
 
 def parse(data, datafile):
-    """Read the Adventure data file and return a ``Data`` object."""
+    """Read the Adventure data file and return a ``Data`` object.
+
+    If `datafile` is a `DataFile`, the long descriptions of rooms, the
+    messages of objects, and the arbitrary messages of section 6 are
+    left in the file, to be read only when first displayed.
+
+    """
     data._last_travel = [0, [0]]  # x and verbs used by section 3
+    data._lines = {}  # text for add_line() to assemble
+    if isinstance(datafile, DataFile):
+        data.source = datafile
 
     while True:
         section_number = int(datafile.readline())
@@ -390,12 +503,43 @@ def parse(data, datafile):
     del data._last_travel  # state used by section 3
     del data._object       # state used by section 5
 
-    data.object_list = sorted(set(data.objects.values()), key=attrgetter('n'))
+    for (_, key), (target, lines) in data._lines.items():
+        if data.source is None:
+            text = ''.join(lines)
+        else:
+            text = data.source.lazy_text(lines) if lines else ''
+        if isinstance(key, int):
+            target.messages[key] = text
+        else:
+            setattr(target, key, text)
+    del data._lines
+
+    if data.source is not None:
+        for obj in data.objects.values():
+            if not isinstance(obj.messages, LazyTexts):
+                obj.messages = LazyTexts(obj.messages)
+
+    objects = { id(obj): obj for obj in data.objects.values() }
+    data.object_list = sorted(objects.values(), key=attrgetter('n'))
     #data.room_list = sorted(set(data.rooms.values()), key=attrgetter('n'))
+    data.object_names = []
     for obj in data.object_list:
         name = obj.names[0]
         if hasattr(data, name):
             name = name + '2'  # create identifiers like ROD2, PLANT2
         setattr(data, name, obj)
+        data.object_names.append((name, obj.n))
+
+    for room in data.rooms.values():
+        room.compile_travel()
+    for hint in data.hints.values():
+        hint.index_rooms()
+
+    # For old-fashioned players, accept five-letter truncations like
+    # "inven" instead of insisting on full words like "inventory".
+
+    for key, value in list(data.vocabulary.items()):
+        if isinstance(key, str) and len(key) > 5:
+            data.vocabulary[key[:5]] = value
 
     return data
@@ -0,0 +1,95 @@
+"""Keep new games started and ready for players who have yet to arrive.
+
+Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
+Apache License, Version 2.0 as detailed in the accompanying README.txt.
+
+"""
+import os
+import threading
+import time
+from collections import deque
+from . import load_world, new_game as build_game
+
+class GameFactory(object):
+    """Hand out new games from a pool that a background thread refills.
+
+    Up to `size` games are kept already started, so that a new player
+    costs a pop from the pool instead of building a game.  Whenever
+    one is taken, the thread builds replacements, pausing between
+    games so that it never keeps the interpreter from the players for
+    long.  If the pool runs dry, games are built on the spot.
+
+    A game has drawn no random numbers before its first command, so it
+    is reseeded as it is handed out: with `seed` if one is given, which
+    makes it play exactly like ``Game(seed)``, and otherwise afresh if
+    it was built before this process was forked, so that two processes
+    never hand out games that share a random stream.
+
+    """
+    def __init__(self, size=100):
+        self.size = size
+        self.ready = deque()  # (pid that built it, game)
+        self.wanted = threading.Event()
+        self.thread = None
+        self.stopping = False
+        self.hits = 0         # games handed out from the pool
+        self.misses = 0       # games built on the spot
+        self.built = 0        # games built by the thread
+
+    def start(self):
+        """Start the thread that fills the pool."""
+        load_world()
+        self.stopping = False
+        self.wanted.set()
+        self.thread = threading.Thread(target=self.fill, daemon=True,
+                                       name='adventure-game-factory')
+        self.thread.start()
+        return self
+
+    def close(self):
+        """Stop the thread and forget the games it built."""
+        self.stopping = True
+        self.wanted.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.ready.clear()
+
+    def fill(self):
+        ready = self.ready
+        while True:
+            self.wanted.wait()
+            self.wanted.clear()
+            while len(ready) < self.size and not self.stopping:
+                game = build_game()
+                self.built += 1
+                ready.append((os.getpid(), game))
+                time.sleep(0)  # let the players have the interpreter
+            if self.stopping:
+                return
+
+    def new_game(self, seed=None):
+        """Return a game waiting at the instructions prompt."""
+        try:
+            pid, game = self.ready.popleft()
+        except IndexError:
+            self.misses += 1
+            game = build_game()
+            pid = os.getpid()
+        else:
+            self.hits += 1
+        self.wanted.set()
+        if seed is not None:
+            game.random_generator.seed(seed)
+        elif pid != os.getpid():
+            game.random_generator.seed()
+        return game
+
+    def stats(self):
+        """Return a dictionary of counts describing the pool."""
+        return {
+            'ready': len(self.ready),
+            'hits': self.hits,
+            'misses': self.misses,
+            'built': self.built,
+            }
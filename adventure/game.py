@@ -11,16 +11,42 @@ Apache License, Version 2.0 as detailed in the accompanying README.txt.
 # that is typed C-s C-q C-j 2 0 1 2 C-i).
 
 import os
-import pickle
 import random
-import zlib
-from operator import attrgetter
-from .data import Data
-from .model import Room, Message, Dwarf, Pirate
+from collections import namedtuple
+from .model import Room, Message, Dwarf, Pirate, Locations
 
 YESNO_ANSWERS = {'y': True, 'yes': True, 'n': False, 'no': False}
 
-class Game(Data):
+# A question awaiting a yes-or-no answer is remembered as plain data,
+# naming the method in ANSWERS that the answer will be passed to along
+# with `args`, rather than as a closure, so that a game can be saved,
+# cloned, or moved to another process at any moment.
+
+Continuation = namedtuple('Continuation', 'name args')
+ANSWERS = {}  # name -> Game method that receives a yes-or-no answer
+
+def _answers(method):
+    """Register `method` as one that can receive a yes-or-no answer."""
+    ANSWERS[method.__name__] = method
+    return method
+
+# A saved game holds only the state that changes during play; the world
+# itself is rebuilt from advent.dat when the game is resumed.  Bump
+# SAVE_FORMAT whenever the layout of `Game.__getstate__()` changes.
+
+SAVE_MAGIC = b'ADVENTURE-SAVE\n'
+SAVE_FORMAT = 1
+SAVED_SCALARS = (
+    'look_complaints', 'full_description_period', 'full_wests',
+    'dwarf_stage', 'dwarves_killed', 'foobar', 'gave_up',
+    'treasures_not_found', 'impossible_treasures', 'lamp_turns',
+    'warned_about_dim_lamp', 'bonus', 'is_dead', 'deaths', 'max_deaths',
+    'turns', 'clock1', 'clock2', 'is_closing', 'panic', 'is_closed',
+    'is_done', 'could_fall_in_pit', 'yesno_casual',
+    )
+SAVED_ROOMS = ('loc', 'oldloc', 'oldloc2', 'chest_room', 'knife_location')
+
+class Game(object):
 
     look_complaints = 3  # how many times to "SORRY, BUT I AM NOT ALLOWED..."
     full_description_period = 5  # how often we use a room's full description
@@ -41,8 +67,7 @@ class Game(Data):
     turns = 0
 
     def __init__(self, seed=None):
-        Data.__init__(self)
-        self.output = ''
+        self._output = []
         self.yesno_callback = False
         self.yesno_casual = False       # whether to insist they answer
 
@@ -53,30 +78,127 @@ class Game(Data):
         self.is_closed = False          # is the cave closed?
         self.is_done = False            # caller can check for "game over"
         self.could_fall_in_pit = False  # could the player fall into a pit?
+        self.times_described = {}       # room number -> times described
+        self.hint_streaks = []          # hints whose turn_counter may be > 0
 
         self.random_generator = random.Random()
         if seed is not None:
             self.random_generator.seed(seed)
 
+    def attach(self, world):
+        """Join the read-only `world` that was parsed from ``advent.dat``.
+
+        Rooms, words, and messages never change during play, so every
+        game shares the world's copies of them.  Objects and hints do
+        change, so each game gets its own copy of those.
+
+        """
+        self.world = world
+        self.rooms = world.rooms
+        self.vocabulary = world.vocabulary
+        self.messages = world.messages
+        self.class_messages = world.class_messages
+        self.magic_messages = world.magic_messages
+
+        self.use_objects({ obj.n: obj.copy() for obj in world.object_list })
+        self.hints = { n: hint.copy() for n, hint in world.hints.items() }
+
+    def use_objects(self, copies):
+        """Install `copies`, a dict of objects by number, as our objects."""
+        world = self.world
+        self.object_list = [ copies[obj.n] for obj in world.object_list ]
+        self.objects = { key: copies[obj.n]
+                         for key, obj in world.objects.items() }
+        self.__dict__.update((name, copies[n])  # like self.lamp
+                             for name, n in world.object_names)
+        self.index_objects()
+
+    def index_objects(self):
+        """Start tracking where each of our objects is."""
+        self.locations = Locations(self.object_list)
+        self.treasures = [ obj for obj in self.object_list if obj.is_treasure ]
+
+    def clone(self):
+        """Return an independent copy of this game that shares our world.
+
+        Only the state that changes during play gets copied, including
+        the random number generator and any question awaiting an answer,
+        so the two games can go on to play out different futures.
+
+        """
+        game = Game.__new__(Game)
+        game.__dict__.update(self.__dict__)
+        game.times_described = self.times_described.copy()
+        game.hint_streaks = list(self.hint_streaks)
+        game._output = list(self._output)
+
+        copies = { obj.n: obj.copy() for obj in self.object_list }
+        for obj in copies.values():
+            if obj.contents is not None:
+                obj.contents = copies[obj.contents.n]
+        game.use_objects(copies)
+        game.hints = { n: hint.copy() for n, hint in self.hints.items() }
+
+        if 'dwarves' in self.__dict__:
+            game.dwarves = [ dwarf.copy() for dwarf in self.dwarves ]
+            game.pirate = self.pirate.copy()
+
+        game.random_generator = random.Random.__new__(random.Random)
+        game.random_generator.setstate(self.random_generator.getstate())
+        return game
+
+    def referent(self, word):
+        if word.kind == 'noun':
+            return self.objects[word.n % 1000]
+
     def random(self):
         return self.random_generator.random()
 
     def choice(self, seq):
         return self.random_generator.choice(seq)
 
+    # Output is gathered as a list of segments and joined only when
+    # someone asks for it, instead of growing one string per message.
+
+    @property
+    def output(self):
+        """The text written since the current command began."""
+        segments = self._output
+        if len(segments) > 1:
+            segments[:] = [ ''.join(segments) ]
+        return segments[0] if segments else ''
+
+    @output.setter
+    def output(self, text):
+        self._output = [ text ] if text else []
+
     def write(self, more):
         """Append the Unicode representation of `s` to our output."""
         if more:
-            self.output += str(more).upper()
-            self.output += '\n'
+            self._output.append(str(more).upper())
+            self._output.append('\n')
+
+    def speak(self, more):
+        """Append text from advent.dat, which is already in upper case."""
+        if more:
+            self._output.append(str(more))
+            self._output.append('\n')
 
     def write_message(self, n):
-        self.write(self.messages[n])
+        self.speak(self.messages[n])
+
+    def yesno(self, s, name, *args, casual=False):
+        """Ask a question and prepare to receive a yes-or-no answer.
+
+        The answer, then `args`, will be passed to the method `name`,
+        which must be registered in ANSWERS; `args` should be plain
+        values, like numbers, so that the game can still be saved.
 
-    def yesno(self, s, yesno_callback, casual=False):
-        """Ask a question and prepare to receive a yes-or-no answer."""
-        self.write(s)
-        self.yesno_callback = yesno_callback
+        """
+        if name not in ANSWERS:
+            raise ValueError('{!r} cannot receive an answer'.format(name))
+        self.speak(s)
+        self.yesno_callback = Continuation(name, args)
         self.yesno_casual = casual
 
     # Properties of the cave.
@@ -89,19 +211,21 @@ class Game(Data):
         return self.loc.is_dark
 
     @property
-    def inventory(self):
-        return [ obj for obj in self.object_list if obj.is_toting ]
+    def liquid_here(self):
+        liquid = self.loc.liquid
+        if liquid is not None:
+            return self.objects[liquid.n]
 
     @property
-    def treasures(self):
-        return [ obj for obj in self.object_list if obj.is_treasure ]
+    def inventory(self):
+        return list(self.locations.toting)
 
     @property
     def objects_here(self):
         return self.objects_at(self.loc)
 
     def objects_at(self, room):
-        return [obj for obj in self.object_list if obj.is_at(room)]
+        return list(self.locations.objects_at(room))
 
     def is_here(self, obj):
         if isinstance(obj, Dwarf):
@@ -117,20 +241,11 @@ class Game(Data):
 
     def start(self):
         """Start the game."""
-
-        # For old-fashioned players, accept five-letter truncations like
-        # "inven" instead of insisting on full words like "inventory".
-
-        for key, value in list(self.vocabulary.items()):
-            if isinstance(key, str) and len(key) > 5:
-                self.vocabulary[key[:5]] = value
-
-        # Set things going.
-
         self.chest_room = self.rooms[114]
         self.bottle.contents = self.water
-        self.yesno(self.messages[65], self.start2)  # want instructions?
+        self.yesno(self.messages[65], 'start2')  # want instructions?
 
+    @_answers
     def start2(self, yes):
         """Display instructions if the user wants them."""
         if yes:
@@ -215,16 +330,9 @@ class Game(Data):
 
         for dwarf in self.dwarves + [ self.pirate ]:
 
-            locations = { move.action for move in dwarf.room.travel_table
-                          if dwarf.can_move(move)
-                          and move.action is not dwarf.old_room
-                          and move.action is not dwarf.room }
-            # Without stabilizing the order with a sort, the room chosen
-            # would depend on how the Room addresses in memory happen to
-            # order the rooms in the set() - and make it impossible to
-            # test the game by setting the random number generator seed
-            # and then playing through the game.
-            locations = sorted(locations, key=attrgetter('n'))
+            old_room = dwarf.old_room
+            locations = [ room for room in dwarf.room.dwarf_exits
+                          if room is not old_room ]
             if locations:
                 new_room = self.choice(locations)
             else:
@@ -256,8 +364,9 @@ class Game(Data):
                     continue  # decide that the pirate is not really here
 
                 treasures = [ t for t in self.treasures if t.is_toting ]
-                if (self.platinum in treasures and self.loc.n in (100, 101)):
-                    treasures.remove(self.platinum)
+                if (self.platinum.is_toting and self.loc.n in (100, 101)):
+                    treasures = [ t for t in treasures
+                                  if t is not self.platinum ]
 
                 if not treasures:
                     h = any( t for t in self.treasures if self.is_here(t) )
@@ -342,12 +451,13 @@ class Game(Data):
         if self.is_dark and not loc.is_forced:
             self.write_message(16)
         else:
-            do_short = loc.times_described % self.full_description_period
-            loc.times_described += 1
+            times_described = self.times_described.get(loc.n, 0)
+            do_short = times_described % self.full_description_period
+            self.times_described[loc.n] = times_described + 1
             if do_short and loc.short_description:
-                self.write(loc.short_description)
+                self.speak(loc.short_description)
             else:
-                self.write(loc.long_description)
+                self.speak(loc.long_description)
 
         if loc.is_forced:
             self.do_motion(self.vocabulary[2])  # dummy motion verb
@@ -371,7 +481,7 @@ class Game(Data):
                 if obj.prop < 0:  # finding a treasure the first time
                     if self.is_closed:
                         continue
-                    obj.prop = 1 if obj in (self.rug, self.chain) else 0
+                    obj.prop = 1 if obj is self.rug or obj is self.chain else 0
                     self.treasures_not_found -= 1
                     if (self.treasures_not_found > 0 and
                         self.treasures_not_found == self.impossible_treasures):
@@ -382,7 +492,7 @@ class Game(Data):
                 else:
                     prop = obj.prop
 
-                self.write(obj.messages[prop])
+                self.speak(obj.messages[prop])
 
         self.finish_turn()
 
@@ -399,33 +509,34 @@ class Game(Data):
         # Advance random number generator so each input affects future.
         self.random()
 
-        # Check whether we should offer a hint.
-        for hint in self.hints.values():
-            if hint.turns_needed == 9999 or hint.used:
-                continue
-            if self.loc in hint.rooms:
-                hint.turn_counter += 1
-                if hint.turn_counter >= hint.turns_needed:
-                    if hint.n != 5:  # hint 5 counter does not get reset
-                        hint.turn_counter = 0
-                    if self.should_offer_hint(hint, obj):
-                        hint.turn_counter = 0
-
-                        def callback(yes):
-                            if yes:
-                                self.write(hint.message)
-                                hint.used = True
-                            else:
-                                self.write_message(54)
-
-                        self.yesno(hint.question, callback)
-                        return
-            else:
-                hint.turn_counter = 0
+        # Check whether we should offer a hint.  Only the hints for this
+        # room can count the turn, and only hints that were counting
+        # need their counters reset, so we visit just those, in order.
+        here = self.loc.hint_ns
+        if here or self.hint_streaks:
+            ns = sorted(set(here).union(self.hint_streaks))
+            self.hint_streaks = streaks = []
+            for i, n in enumerate(ns):
+                hint = self.hints[n]
+                if hint.used:
+                    continue
+                if n in here:
+                    streaks.append(n)
+                    hint.turn_counter += 1
+                    if hint.turn_counter >= hint.turns_needed:
+                        if hint.n != 5:  # hint 5 counter does not get reset
+                            hint.turn_counter = 0
+                        if self.should_offer_hint(hint, obj):
+                            hint.turn_counter = 0
+                            streaks.extend(ns[i+1:])  # not checked this turn
+                            self.yesno(hint.question, 'give_hint', n)
+                            return
+                else:
+                    hint.turn_counter = 0
 
         if self.is_closed:
             if self.oyster.prop < 0 and self.oyster.is_toting:
-                self.write(self.oyster.messages[1])
+                self.speak(self.oyster.messages[1])
             for obj in self.inventory:
                 if obj.prop < 0:
                     obj.prop = - 1 - obj.prop
@@ -439,10 +550,58 @@ class Game(Data):
 
     def do_command(self, words):
         """Parse and act upon the command in the list of strings `words`."""
-        self.output = ''
+        self._output = []
         self._do_command(words)
         return self.output
 
+    def iter_commands(self, commands, stop_at_death=False,
+                      stop_at_question=False):
+        """Act on each command in `commands`, yielding the output of each.
+
+        Commands are lists of words, as for `do_command()`.  Running
+        stops once the game is finished, since later commands would
+        only be told so; with `stop_at_death` it also stops after a
+        command that leaves the player dead, and with `stop_at_question`
+        after one that leaves a yes-or-no question waiting, so that the
+        caller can decide how to answer.
+
+        """
+        run = self._do_command
+        for words in commands:
+            if self.is_finished:
+                return
+            self._output = []
+            run(words)
+            yield self.output
+            if stop_at_death and self.is_dead:
+                return
+            if stop_at_question and self.yesno_callback is not None:
+                return
+
+    def do_commands(self, commands, stop_at_death=False,
+                    stop_at_question=False):
+        """Run `commands` like `iter_commands()`, returning a list of outputs.
+
+        The list is shorter than `commands` if running stopped early.
+
+        """
+        return list(self.iter_commands(commands, stop_at_death,
+                                       stop_at_question))
+
+    def stream_command(self, words, emit):
+        """Act on `words` like `do_command()`, passing output to `emit()`.
+
+        Each piece of output is handed to `emit` as soon as it is
+        written, so a caller can begin delivering the start of a long
+        turn before the end of the turn has been computed.
+
+        """
+        self._output = _Stream(emit)
+        try:
+            self._do_command(words)
+        finally:
+            self._output = []
+
     def _do_command(self, words):
         if self.yesno_callback is not None:
             answer = YESNO_ANSWERS.get(words[0], None)
@@ -453,9 +612,9 @@ class Game(Data):
                     self.write('Please answer the question.')
                     return
             else:
-                callback = self.yesno_callback
+                name, args = self.yesno_callback
                 self.yesno_callback = None
-                callback(answer)
+                ANSWERS[name](self, answer, *args)
                 return
 
         if self.is_dead:
@@ -529,26 +688,28 @@ class Game(Data):
         word1 = words[0]
         word2 = words[1] if len(words) == 2 else None
 
-        if word1 == 'enter' and (word2 == 'stream' or word2 == 'water'):
-            if self.loc.liquid is self.water:
+        # Words are compared by number, which every synonym shares.
+
+        if word1.n == 3 and word2 and word2.n in (14, 1021):  # enter water
+            if self.liquid_here is self.water:
                 self.write_message(70)
             else:
                 self.write_message(43)
             return self.finish_turn()
 
-        if (word1 == 'enter' or word1 == 'walk') and word2:
+        if word1.n in (3, 2011) and word2:  # "enter" or "walk"
             #2800  'enter house' becomes simply 'house' and so forth
             word1, word2 = word2, None
 
-        if ((word1 == 'water' or word1 == 'oil') and
-            (word2 == 'plant' or word2 == 'door') and
+        if (word1.n in (1021, 1022) and  # water, oil
+            word2 and word2.n in (1024, 1025, 1009) and  # plant, door
             self.is_here(self.referent(word2))):
             word1, word2 = self.vocabulary['pour'], word1
 
-        if word1 == 'say':
+        if word1.n == 2003:  # say
             return self.t_say(word1, word2) if word2 else self.i_say(word1)
 
-        if word2 == 'say':
+        if word2 and word2.n == 2003:
             return self.t_say(word2, word1)
 
         kinds = (word1.kind, word2.kind if word2 else None)
@@ -587,11 +748,11 @@ class Game(Data):
                         return self.dispatch_command([ 'depression' ])
                     elif 9 < self.loc.n < 15:
                         return self.dispatch_command([ 'entrance' ])
-                elif noun == 'dwarf':
+                elif noun.n == 1017:  # dwarf
                     obj_here = any( d.room is self.loc for d in self.dwarves )
                 elif obj is self.bottle.contents and self.is_here(self.bottle):
                     obj_here = True
-                elif obj is self.loc.liquid:
+                elif obj is self.liquid_here:
                     obj_here = True
                 elif (obj is self.plant and self.is_here(self.plant2)
                       and self.plant2.prop != 0):
@@ -604,7 +765,7 @@ class Game(Data):
                 elif obj is self.rod and self.is_here(self.rod2):
                     obj = self.rod2
                     obj_here = True
-                elif verb and (verb == 'find' or verb == 'inventory'):
+                elif verb and verb.n in (2019, 2020):  # find, inventory
                     obj_here = True  # lie; these verbs work for absent objects
 
             if not obj_here:
@@ -644,11 +805,11 @@ class Game(Data):
 
     def do_motion(self, word):  #8
 
-        if word == 'null': #2
+        if word.n == 21:  #2  null
             self.move_to()
             return
 
-        elif word == 'back':  #20
+        elif word.n == 8:  #20  back
             dest = self.oldloc2 if self.oldloc.is_forced else self.oldloc
             self.oldloc2, self.oldloc = self.oldloc, self.loc
             if dest is self.loc:
@@ -672,94 +833,80 @@ class Game(Data):
                     self.move_to()
                     return
 
-        elif word == 'look':  #30
+        elif word.n == 57:  #30  look
             if self.look_complaints > 0:
                 self.write_message(15)
                 self.look_complaints -= 1
-            self.loc.times_described = 0
+            self.times_described[self.loc.n] = 0
             self.move_to()
             self.could_fall_in_pit = False
             return
 
-        elif word == 'cave':  #40
+        elif word.n == 67:  #40  cave
             self.write_message(57 if self.loc.is_aboveground else 58)
             self.move_to()
             return
 
         self.oldloc2, self.oldloc = self.oldloc, self.loc
 
-        for move in self.loc.travel_table:
-            if move.is_forced or word in move.verbs:
-                c = move.condition
-
-                if c[0] is None or c[0] == 'not_dwarf':
-                    allowed = True
-                elif c[0] == '%':
-                    allowed = 100 * self.random() < c[1]
-                elif c[0] == 'carrying':
-                    allowed = self.objects[c[1]].is_toting
-                elif c[0] == 'carrying_or_in_room_with':
-                    allowed = self.is_here(self.objects[c[1]])
-                elif c[0] == 'prop!=':
-                    allowed = self.objects[c[1]].prop != c[2]
-
-                if not allowed:
-                    continue
+        for move in self.loc.moves_for(word):
+            if move.test is not None and not move.test(self, *move.test_args):
+                continue
 
-                if isinstance(move.action, Room):
-                    self.move_to(move.action)
-                    return
+            if isinstance(move.action, Room):
+                self.move_to(move.action)
+                return
+
+            elif isinstance(move.action, Message):
+                self.speak(move.action)
+                self.move_to()
+                return
 
-                elif isinstance(move.action, Message):
-                    self.write(move.action)
+            elif move.action == 301:  #30100
+                inv = self.inventory
+                if inv and not (len(inv) == 1 and inv[0] is self.emerald):
+                    self.write_message(117)
                     self.move_to()
-                    return
+                elif self.loc.n == 100:
+                    self.move_to(self.rooms[99])
+                else:
+                    self.move_to(self.rooms[100])
+                return
 
-                elif move.action == 301:  #30100
-                    inv = self.inventory
-                    if len(inv) != 0 and inv != [ self.emerald ]:
-                        self.write_message(117)
-                        self.move_to()
-                    elif self.loc.n == 100:
-                        self.move_to(self.rooms[99])
-                    else:
-                        self.move_to(self.rooms[100])
-                    return
+            elif move.action == 302:  #30200
+                self.emerald.drop(self.loc)
+                self.do_motion(word)
+                return
 
-                elif move.action == 302:  #30200
-                    self.emerald.drop(self.loc)
-                    self.do_motion(word)
+            elif move.action == 303:  #30300
+                troll, troll2 = self.troll, self.troll2
+                if troll.prop == 1:
+                    self.speak(troll.messages[1])
+                    troll.prop = 0
+                    troll.rooms = list(troll.starting_rooms)
+                    troll2.destroy()
+                    self.move_to()
                     return
-
-                elif move.action == 303:  #30300
-                    troll, troll2 = self.troll, self.troll2
-                    if troll.prop == 1:
-                        self.write(troll.messages[1])
-                        troll.prop = 0
-                        troll.rooms = list(troll.starting_rooms)
-                        troll2.destroy()
+                else:
+                    places = list(troll.starting_rooms)
+                    places.remove(self.loc)
+                    self.loc = places[0]  # "the other side of the bridge"
+                    if troll.prop == 0:
+                        troll.prop = 1
+                    if not self.bear.is_toting:
                         self.move_to()
                         return
-                    else:
-                        places = list(troll.starting_rooms)
-                        places.remove(self.loc)
-                        self.loc = places[0]  # "the other side of the bridge"
-                        if troll.prop == 0:
-                            troll.prop = 1
-                        if not self.bear.is_toting:
-                            self.move_to()
-                            return
-                        self.write_message(162)
-                        self.chasm.prop = 1
-                        troll.prop = 2
-                        self.bear.drop(self.loc)
-                        self.bear.is_fixed = True
-                        self.bear.prop = 3
-                        if self.spices.prop < 0:
-                            self.impossible_treasures += 1
-                        self.oldloc2 = self.loc  # refuse to strand belongings
-                        self.die()
-                        return
+                    self.write_message(162)
+                    self.chasm.prop = 1
+                    troll.prop = 2
+                    self.bear.drop(self.loc)
+                    self.bear.is_fixed = True
+                    self.bear.prop = 3
+                    if self.spices.prop < 0:
+                        self.impossible_treasures += 1
+                    self.oldloc2 = self.loc  # refuse to strand belongings
+                    self.die()
+                    return
 
         #50
         n = word.n
@@ -794,28 +941,29 @@ class Game(Data):
             self.score_and_exit()
             return
 
-        def callback(yes):
-            if yes:
-                self.write_message(80 + self.deaths * 2)
-                if self.deaths < self.max_deaths:
-                    if self.bottle.contents is not None:
-                        self.bottle.contents.hide()
-                    self.is_dead = False
-                    if self.lamp.is_toting:
-                        self.lamp.prop = 0
-                    for obj in self.inventory:
-                        if obj is self.lamp:
-                            obj.drop(self.rooms[1])
-                        else:
-                            obj.drop(self.oldloc2)
-                    self.loc = self.rooms[3]
-                    self.describe_location()
-                    return
-            else:
-                self.write_message(54)
-            self.score_and_exit()
+        self.yesno(self.messages[79 + self.deaths * 2], 'reincarnate')
 
-        self.yesno(self.messages[79 + self.deaths * 2], callback)
+    @_answers
+    def reincarnate(self, yes):
+        if yes:
+            self.write_message(80 + self.deaths * 2)
+            if self.deaths < self.max_deaths:
+                if self.bottle.contents is not None:
+                    self.bottle.contents.hide()
+                self.is_dead = False
+                if self.lamp.is_toting:
+                    self.lamp.prop = 0
+                for obj in self.inventory:
+                    if obj is self.lamp:
+                        obj.drop(self.rooms[1])
+                    else:
+                        obj.drop(self.oldloc2)
+                self.loc = self.rooms[3]
+                self.describe_location()
+                return
+        else:
+            self.write_message(54)
+        self.score_and_exit()
 
     # Verbs.
 
@@ -837,7 +985,7 @@ class Game(Data):
     i_wake = ask_verb_what
 
     def write_default_message(self, verb, *args):
-        self.write(verb.default_message)
+        self.speak(verb.default_message)
         self.finish_turn()
 
     t_nothing = say_okay_and_finish
@@ -859,7 +1007,7 @@ class Game(Data):
 
     def t_carry(self, verb, obj):  #9010
         if obj.is_toting:
-            self.write(verb.default_message)
+            self.speak(verb.default_message)
             self.finish_turn()
             return
         if obj.is_fixed or len(obj.rooms) > 1:
@@ -916,7 +1064,7 @@ class Game(Data):
             obj = self.rod2
 
         if not obj.is_toting:
-            self.write(verb.default_message)
+            self.speak(verb.default_message)
             self.finish_turn()
             return
 
@@ -934,7 +1082,7 @@ class Game(Data):
         elif obj is self.coins and self.is_here(self.machine):
             obj.destroy()
             self.batteries.drop(self.loc)
-            self.write(self.batteries.messages[0])
+            self.speak(self.batteries.messages[0])
             self.finish_turn()
             return
 
@@ -959,7 +1107,7 @@ class Game(Data):
             else:
                 self.vase.prop = 2
                 self.vase.is_fixed = True
-            self.write(self.vase.messages[self.vase.prop + 1])
+            self.speak(self.vase.messages[self.vase.prop + 1])
 
         else:
             self.write_message(54)
@@ -1001,7 +1149,7 @@ class Game(Data):
         if obj is self.clam or obj is self.oyster:
             #9046
             oy = 1 if (obj is self.oyster) else 0
-            if verb == 'lock':
+            if verb.n == 2006:  # lock
                 self.write_message(61)
             elif not self.trident.is_toting:
                 self.write_message(122 + oy)
@@ -1028,7 +1176,7 @@ class Game(Data):
                 self.write_message(31)
             elif obj is self.chain:
                 #9048
-                if verb == 'unlock':
+                if verb.n == 2004:  # unlock
                     if self.chain.prop == 0:
                         self.write_message(37)
                     elif self.bear.prop == 0:
@@ -1060,17 +1208,17 @@ class Game(Data):
             else:
                 #9043
                 oldprop = obj.prop
-                obj.prop = 0 if verb == 'lock' else 1
+                obj.prop = 0 if verb.n == 2006 else 1  # lock
                 self.write_message(34 + oldprop + 2 * obj.prop)
         else:
-            self.write(verb.default_message)
+            self.speak(verb.default_message)
         self.finish_turn()
 
     t_lock = t_unlock
 
     def t_light(self, verb, obj=None):  #9070
         if not self.is_here(self.lamp):
-            self.write(verb.default_message)
+            self.speak(verb.default_message)
         elif self.lamp_turns <= 0:
             self.write_message(184)
         else:
@@ -1084,7 +1232,7 @@ class Game(Data):
 
     def t_extinguish(self, verb, obj=None):  #9080
         if not self.is_here(self.lamp):
-            self.write(verb.default_message)
+            self.speak(verb.default_message)
         else:
             self.lamp.prop = 0
             self.write_message(40)
@@ -1100,10 +1248,10 @@ class Game(Data):
         if (obj is self.rod and obj.is_toting and self.is_here(fissure)
             and not self.is_closing):
             fissure.prop = 0 if fissure.prop else 1
-            self.write(fissure.messages[2 - fissure.prop])
+            self.speak(fissure.messages[2 - fissure.prop])
         else:
             if obj.is_toting or (obj is self.rod and self.rod2.is_toting):
-                self.write(verb.default_message)
+                self.speak(verb.default_message)
             else:
                 self.write_message(29)
 
@@ -1119,7 +1267,7 @@ class Game(Data):
         if len(dangers) == 1:
             return self.t_attack(verb, dangers[0])
         targets = []
-        if self.is_here(self.bird) and verb != 'throw':
+        if self.is_here(self.bird) and verb.n != 2017:  # throw
             targets.append(self.bird)
         if self.is_here(self.clam) or self.is_here(self.oyster):
             targets.append(self.clam)
@@ -1153,22 +1301,7 @@ class Game(Data):
             if self.dragon.prop != 0:
                 self.write_message(167)
             else:
-                def callback(yes):
-                    self.write(obj.messages[1])
-                    obj.prop = 2
-                    obj.is_fixed = True
-                    oldroom1 = obj.rooms[0]
-                    oldroom2 = obj.rooms[1]
-                    newroom = self.rooms[ (oldroom1.n + oldroom2.n) // 2 ]
-                    obj.drop(newroom)
-                    self.rug.prop = 0
-                    self.rug.is_fixed = False
-                    self.rug.drop(newroom)
-                    for oldroom in (oldroom1, oldroom2):
-                        for o in self.objects_at(oldroom):
-                            o.drop(newroom)
-                    self.move_to(newroom)
-                self.yesno(self.messages[49], callback, casual=True)
+                self.yesno(self.messages[49], 'slay_dragon', casual=True)
                 return
         elif obj is self.troll:
             self.write_message(157)
@@ -1188,7 +1321,7 @@ class Game(Data):
         if obj is self.bottle:
             return self.i_pour(verb)
         if not obj.is_toting:
-            self.write(verb.default_message)
+            self.speak(verb.default_message)
         elif obj is not self.oil and obj is not self.water:
             self.write_message(78)
         else:
@@ -1199,7 +1332,7 @@ class Game(Data):
                 if obj is not self.water:
                     self.write_message(112)
                 else:
-                    self.write(self.plant.messages[self.plant.prop + 1])
+                    self.speak(self.plant.messages[self.plant.prop + 1])
                     self.plant.prop = (self.plant.prop + 2) % 6
                     self.plant2.prop = self.plant.prop // 2
                     return self.move_to()
@@ -1222,15 +1355,16 @@ class Game(Data):
             #8142
             self.food.destroy()
             self.write_message(72)
-        elif obj in (self.bird, self.snake, self.clam, self.oyster,
-                     self.dwarf, self.dragon, self.troll, self.bear):
+        elif any(obj is other for other in (
+                self.bird, self.snake, self.clam, self.oyster,
+                self.dwarf, self.dragon, self.troll, self.bear)):
             self.write_message(71)
         else:
-            self.write(verb.default_message)
+            self.speak(verb.default_message)
         self.finish_turn()
 
     def i_drink(self, verb):  #9150
-        if self.is_here(self.water) or self.loc.liquid is self.water:
+        if self.is_here(self.water) or self.liquid_here is self.water:
             self.t_drink(verb, self.water)
         else:
             self.ask_verb_what(verb)
@@ -1243,13 +1377,13 @@ class Game(Data):
             self.bottle.contents = None
             self.water.destroy()
             self.write_message(74)
-        elif self.loc.liquid is self.water:
-            self.write(verb.default_message)
+        elif self.liquid_here is self.water:
+            self.speak(verb.default_message)
         self.finish_turn()
 
     def t_rub(self, verb, obj):  #9160
         if obj is self.lamp:
-            self.write(verb.default_message)
+            self.speak(verb.default_message)
         else:
             self.write_message(71)
         self.finish_turn()
@@ -1259,7 +1393,7 @@ class Game(Data):
             obj = self.rod2
 
         if not obj.is_toting:
-            self.write(verb.default_message)
+            self.speak(verb.default_message)
             self.finish_turn()
             return
 
@@ -1318,12 +1452,32 @@ class Game(Data):
 
         self.t_attack(verb, None)
 
+    @_answers
+    def slay_dragon(self, yes):
+        obj = self.dragon
+        self.speak(obj.messages[1])
+        obj.prop = 2
+        obj.is_fixed = True
+        oldroom1 = obj.rooms[0]
+        oldroom2 = obj.rooms[1]
+        newroom = self.rooms[ (oldroom1.n + oldroom2.n) // 2 ]
+        obj.drop(newroom)
+        self.rug.prop = 0
+        self.rug.is_fixed = False
+        self.rug.drop(newroom)
+        for oldroom in (oldroom1, oldroom2):
+            for o in self.objects_at(oldroom):
+                o.drop(newroom)
+        self.move_to(newroom)
+
     def i_quit(self, verb):  #8180
-        def callback(yes):
-            self.write_message(54)
-            if yes:
-                self.score_and_exit()
-        self.yesno(self.messages[22], callback)
+        self.yesno(self.messages[22], 'quit_if_sure')
+
+    @_answers
+    def quit_if_sure(self, yes):
+        self.write_message(54)
+        if yes:
+            self.score_and_exit()
 
     def t_find(self, verb, obj):  #9190
         if obj.is_toting:
@@ -1331,11 +1485,11 @@ class Game(Data):
         elif self.is_closed:
             self.write_message(138)
         elif (self.is_here(obj) or
-            obj is self.loc.liquid or
+            obj is self.liquid_here or
             obj is self.dwarf and any(d.room is self.loc for d in self.dwarves)):
             self.write_message(94)
         else:
-            self.write(verb.default_message)
+            self.speak(verb.default_message)
         self.finish_turn()
 
     t_inventory = t_find
@@ -1347,7 +1501,7 @@ class Game(Data):
             if first:
                 self.write_message(99)
                 first = False
-            self.write(obj.inventory_message)
+            self.speak(obj.inventory_message)
         if self.bear.is_toting:
             self.write_message(141)
         if not objs:
@@ -1377,7 +1531,7 @@ class Game(Data):
                 self.write_message(103)
                 self.dwarf_stage += 1
             else:
-                self.write(verb.default_message)
+                self.speak(verb.default_message)
         elif obj is self.bear:
             if not self.is_here(self.food):
                 if self.bear.prop == 0:
@@ -1385,7 +1539,7 @@ class Game(Data):
                 elif self.bear.prop == 3:
                     self.write_message(110)
                 else:
-                    self.write(verb.default_message)
+                    self.speak(verb.default_message)
             else:
                 self.food.destroy()
                 self.bear.prop = 1
@@ -1403,7 +1557,7 @@ class Game(Data):
 
     def t_fill(self, verb, obj):
         if obj is self.bottle:
-            liquid = self.loc.liquid
+            liquid = self.liquid_here
             if liquid is None:
                 self.write_message(106)
             elif self.bottle.contents:
@@ -1420,7 +1574,7 @@ class Game(Data):
         elif obj is self.vase:
             #9222
             if self.vase.is_toting:
-                if self.loc.liquid is None:
+                if self.liquid_here is None:
                     self.write_message(144)
                 else:
                     self.write_message(145)
@@ -1428,14 +1582,14 @@ class Game(Data):
                     self.vase.prop = 2
                     self.vase.is_fixed = True
             else:
-                self.write(verb.default_message)
+                self.speak(verb.default_message)
         else:
-            self.write(verb.default_message)
+            self.speak(verb.default_message)
         self.finish_turn()
 
     def t_blast(self, verb, obj=None):  #9230
         if self.rod2.prop < 0 or not self.is_closed:
-            self.write(verb.default_message)
+            self.speak(verb.default_message)
             self.finish_turn()
             return
         if self.is_here(self.rod2):
@@ -1453,11 +1607,7 @@ class Game(Data):
         score, max_score = self.compute_score(for_score_command=True)
         self.write('If you were to quit now, you would score {}'
                    ' out of a possible {}.\n'.format(score, max_score))
-        def callback(yes):
-            self.write_message(54)
-            if yes:
-                self.score_and_exit()
-        self.yesno(self.messages[143], callback)
+        self.yesno(self.messages[143], 'quit_if_sure')
 
     def i_fee(self, verb):  #8250
         for n in range(5):
@@ -1481,11 +1631,11 @@ class Game(Data):
                 if not eggs.rooms and not troll.rooms and not troll.prop:
                     self.troll.prop = 1
                 if self.loc is start:
-                    self.write(eggs.messages[0])
+                    self.speak(eggs.messages[0])
                 elif self.is_here(eggs):
-                    self.write(eggs.messages[1])
+                    self.speak(eggs.messages[1])
                 else:
-                    self.write(eggs.messages[2])
+                    self.speak(eggs.messages[2])
                 eggs.rooms = list(eggs.starting_rooms)
                 eggs.is_toting = False
         self.finish_turn()
@@ -1511,13 +1661,7 @@ class Game(Data):
             return self.i_see_no(obj.names[0])
         elif (obj is self.oyster and not self.hints[2].used and
               self.oyster.is_toting):
-            def callback(yes):
-                if yes:
-                    self.hints[2].used = True
-                    self.write_message(193)
-                else:
-                    self.write_message(54)
-            self.yesno(self.messages[192], callback)
+            self.yesno(self.messages[192], 'read_oyster')
         elif obj is self.oyster and self.hints[2].used:
             self.write_message(194)
         elif obj is self.message:
@@ -1527,9 +1671,17 @@ class Game(Data):
         elif obj is self.magazine:
             self.write_message(190)
         else:
-            self.write(verb.default_message)
+            self.speak(verb.default_message)
         self.finish_turn()
 
+    @_answers
+    def read_oyster(self, yes):
+        if yes:
+            self.hints[2].used = True
+            self.write_message(193)
+        else:
+            self.write_message(54)
+
     def t_break(self, verb, obj):  #9280
         if obj is self.vase and self.vase.prop == 0:
             self.write_message(198)
@@ -1544,7 +1696,7 @@ class Game(Data):
         elif obj is self.mirror:
             self.write_message(148)
         else:
-            self.write(verb.default_message)
+            self.speak(verb.default_message)
         self.finish_turn()
 
     def t_wake(self, verb, obj):  #9290
@@ -1552,7 +1704,7 @@ class Game(Data):
             self.write_message(199)
             self.wake_repository_dwarves()
         else:
-            self.write(verb.default_message)
+            self.speak(verb.default_message)
             self.finish_turn()
 
     def i_suspend(self, verb):
@@ -1568,17 +1720,20 @@ class Game(Data):
             savefile = open(obj, 'wb')
         else:
             savefile = obj
-        r = self.random_generator  # must replace live object with static state
-        self.random_state = r.getstate()
         try:
-            del self.random_generator
-            savefile.write(zlib.compress(pickle.dumps(self), 9))
+            self.save(savefile)
         finally:
-            self.random_generator = r
             if savefile is not obj:
                 savefile.close()
         self.write('Game saved')
 
+    def save(self, savefile):
+        """Write this game to the binary file `savefile`."""
+        import pickle  # imported here, so that startup need not wait
+        import zlib
+        data = pickle.dumps(self, pickle.HIGHEST_PROTOCOL)
+        savefile.write(SAVE_MAGIC + zlib.compress(data))
+
     def i_hours(self, verb):
         self.write('Open all day')
 
@@ -1589,14 +1744,115 @@ class Game(Data):
             savefile = open(obj, 'rb')
         else:
             savefile = obj
-        game = pickle.loads(zlib.decompress(savefile.read()))
+        data = savefile.read()
         if savefile is not obj:
             savefile.close()
-        # Reinstate the random number generator.
-        game.random_generator = random.Random()
-        game.random_generator.setstate(game.random_state)
-        del game.random_state
-        return game
+        import pickle
+        import zlib
+        if data.startswith(SAVE_MAGIC):
+            return pickle.loads(zlib.decompress(data[len(SAVE_MAGIC):]))
+        # A save from version 1.6 or earlier pickled the entire game,
+        # which `__setstate__()` moves onto the shared world.
+        return pickle.loads(zlib.decompress(data))
+
+    # Saving and restoring only the state that changes during play.
+
+    def __getstate__(self):
+        """Return the state of this game as plain numbers and strings."""
+        from array import array
+        question = self.yesno_callback
+        version, internal_state, gauss_next = self.random_generator.getstate()
+        dwarves = getattr(self, 'dwarves', None)
+        pirate = getattr(self, 'pirate', None)
+        return {
+            'format': SAVE_FORMAT,
+            'scalars': { name: getattr(self, name) for name in SAVED_SCALARS },
+            'rooms': { name: _room_n(getattr(self, name, None))
+                       for name in SAVED_ROOMS },
+            'times_described': dict(self.times_described),
+            'objects': [ (obj.n, obj.prop, [ room.n for room in obj.rooms ],
+                          obj.is_toting, obj.is_fixed,
+                          obj.contents and obj.contents.n)
+                         for obj in self.object_list ],
+            'hints': [ (hint.n, hint.turn_counter, hint.used)
+                       for hint in self.hints.values() ],
+            'dwarves': None if dwarves is None else [
+                _dwarf_state(dwarf) for dwarf in dwarves ],
+            'pirate': None if not isinstance(pirate, Pirate)
+                      else _dwarf_state(pirate),
+            'yesno_callback': question and (question.name, question.args),
+            'random': (version, array('I', internal_state).tobytes(),
+                       gauss_next),
+            }
+
+    def __setstate__(self, state):
+        """Rebuild a game from `__getstate__()` against the shared world."""
+        from array import array
+        if 'format' not in state:  # a whole game pickled by version <= 1.6
+            state = _legacy_state(state)
+        if state['format'] != SAVE_FORMAT:
+            raise ValueError('cannot read saved game format {}'
+                             .format(state['format']))
+
+        from . import load_world
+
+        self.__init__()
+        self.attach(load_world())
+        rooms = self.rooms
+
+        for name, value in state['scalars'].items():
+            setattr(self, name, value)
+        for name, n in state['rooms'].items():
+            if n is not None:
+                setattr(self, name, rooms[n])
+        self.times_described = dict(state['times_described'])
+
+        objects = self.objects
+        for n, prop, room_ns, is_toting, is_fixed, contents_n in \
+                state['objects']:
+            obj = objects[n]
+            obj.prop = prop
+            obj.rooms = [ rooms[room_n] for room_n in room_ns ]
+            obj.is_toting = is_toting
+            obj.is_fixed = is_fixed
+            obj.contents = None if contents_n is None else objects[contents_n]
+
+        for n, turn_counter, used in state['hints']:
+            hint = self.hints[n]
+            hint.turn_counter = turn_counter
+            hint.used = used
+        self.find_hint_streaks()
+
+        if state['dwarves'] is not None:
+            self.dwarves = [ _make_dwarf(Dwarf, rooms, dwarf_state)
+                             for dwarf_state in state['dwarves'] ]
+        if state['pirate'] is not None:
+            self.pirate = _make_dwarf(Pirate, rooms, state['pirate'])
+
+        question = state['yesno_callback']
+        if isinstance(question, str):  # saved before questions had args
+            question = Continuation(question, ())
+        elif question:
+            question = Continuation(*question)
+        self.yesno_callback = question
+
+        version, internal_state, gauss_next = state['random']
+        internal_state = tuple(array('I', internal_state))
+        self.random_generator.setstate((version, internal_state, gauss_next))
+
+    def find_hint_streaks(self):
+        """Note which hints have started counting turns."""
+        self.hint_streaks = sorted(n for n, hint in self.hints.items()
+                                   if hint.turn_counter)
+
+    @_answers
+    def give_hint(self, yes, n):
+        if yes:
+            hint = self.hints[n]
+            self.speak(hint.message)
+            hint.used = True
+        else:
+            self.write_message(54)
 
     def should_offer_hint(self, hint, obj): #40000
         if hint.n == 4:  # cave
@@ -1730,3 +1986,58 @@ class Game(Data):
             self.write('To achieve the next higher rating '
                        'would be a neat trick!\n\nCongratulations!!\n')
         self.is_done = True
+
+class _Stream(object):
+    """Stands in for the output list, handing each segment to `emit`."""
+
+    def __init__(self, emit):
+        self.append = emit
+
+    def __len__(self):
+        return 0  # so `output` reads as empty while streaming
+
+def _room_n(room):
+    return None if room is None else room.n
+
+def _legacy_state(old):
+    """Turn the attributes of a game pickled whole by version <= 1.6 into
+    the state that `Game.__getstate__()` returns today."""
+    from array import array
+    version, internal_state, gauss_next = old['random_state']
+    question = old.get('yesno_callback')
+    dwarves = old.get('dwarves')
+    pirate = old.get('pirate')
+    return {
+        'format': SAVE_FORMAT,
+        'scalars': { name: old[name] for name in SAVED_SCALARS
+                     if name in old },
+        'rooms': { name: _room_n(old.get(name)) for name in SAVED_ROOMS },
+        'times_described': { room.n: room.times_described
+                             for room in old['rooms'].values()
+                             if room.times_described },
+        'objects': [ (obj.n, obj.prop, [ room.n for room in obj.rooms ],
+                      obj.is_toting, obj.is_fixed,
+                      obj.contents and obj.contents.n)
+                     for obj in old['object_list'] ],
+        'hints': [ (hint.n, hint.turn_counter, hint.used)
+                   for hint in old['hints'].values() ],
+        'dwarves': None if dwarves is None else [
+            _dwarf_state(dwarf) for dwarf in dwarves ],
+        'pirate': None if not isinstance(pirate, Pirate)
+                  else _dwarf_state(pirate),
+        # Only bound methods could be pickled, and none took arguments.
+        'yesno_callback': (question.__name__, ()) if callable(question)
+                          else None,
+        'random': (version, array('I', internal_state).tobytes(),
+                   gauss_next),
+        }
+
+def _dwarf_state(dwarf):
+    return (dwarf.room.n, dwarf.old_room.n, dwarf.has_seen_adventurer)
+
+def _make_dwarf(klass, rooms, state):
+    room_n, old_room_n, has_seen_adventurer = state
+    dwarf = klass(rooms[room_n])
+    dwarf.old_room = rooms[old_room_n]
+    dwarf.has_seen_adventurer = has_seen_adventurer
+    return dwarf
@@ -4,13 +4,51 @@ Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
 Apache License, Version 2.0 as detailed in the accompanying README.txt.
 
 """
-class Move(object):
+from operator import attrgetter
+
+class _Slotted(object):
+    """A model class that keeps its attributes in slots, not a dictionary.
+
+    Every game holds hundreds of these, so the per-instance dictionary
+    would cost more than the attributes themselves.  Each subclass sets
+    every slot in an `__init__()` that needs no arguments, so that an
+    instance can always be pickled as a plain tuple of its attributes.
+    A dictionary pickled by version 1.6 or earlier can still be loaded.
+
+    """
+    __slots__ = ()
+    _names = ()  # every slot, across the whole class hierarchy
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._names = cls._names + tuple(cls.__dict__.get('__slots__', ()))
+        cls._values = attrgetter(*cls._names)
+
+    def __getstate__(self):
+        return self._values(self)
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):  # pickled by version 1.6 or earlier
+            self.__init__()
+            state = state.items()
+        else:
+            state = zip(self._names, state)
+        for name, value in state:
+            setattr(self, name, value)
+
+class Move(_Slotted):
     """An entry in the travel table."""
 
-    is_forced = False
-    verbs = []
-    condition = None
-    action = None
+    __slots__ = ('is_forced', 'verbs', 'condition', 'action',
+                 'test', 'test_args')
+
+    def __init__(self):
+        self.is_forced = False
+        self.verbs = ()
+        self.condition = None
+        self.action = None
+        self.test = None  # compiled from `condition`, or None if always allowed
+        self.test_args = ()
 
     def __repr__(self):
         verblist = [ verb.text for verb in self.verbs ]
@@ -39,17 +77,44 @@ class Move(object):
 
         return '<{}{} {}>'.format('|'.join(verblist), condition, action)
 
-class Room(object):
+    def compile(self):
+        """Turn our `condition` tuple into a `test` function and arguments."""
+        kind = self.condition[0]
+        self.test = CONDITION_TESTS[kind]
+        self.test_args = self.condition[1:] if self.test else ()
+
+# The functions that compiled moves call to test their conditions.  They
+# live at module level so that a pickled world can refer to them.
+
+def chance(game, percent):
+    return 100 * game.random() < percent
+
+def carrying(game, n):
+    return game.objects[n].is_toting
+
+def carrying_or_in_room_with(game, n):
+    return game.is_here(game.objects[n])
+
+def prop_is_not(game, n, prop):
+    return game.objects[n].prop != prop
+
+CONDITION_TESTS = {
+    None: None,
+    'not_dwarf': None,  # dwarves ignore the travel table's conditions
+    '%': chance,
+    'carrying': carrying,
+    'carrying_or_in_room_with': carrying_or_in_room_with,
+    'prop!=': prop_is_not,
+    }
+
+class Room(_Slotted):
     """A location in the game."""
 
-    long_description = ''
-    short_description = ''
-    times_described = 0
-    visited = False
+    __slots__ = ('n', '_long_description', 'short_description', 'is_light',
+                 'is_forbidden_to_pirate', 'liquid', 'travel_table',
+                 'routes', 'forced_routes', 'dwarf_exits', 'hint_ns',
+                 'times_described')
 
-    is_light = False
-    is_forbidden_to_pirate = False
-    liquid = None
     trying_to_get_into_cave = False
     trying_to_catch_bird = False
     trying_to_deal_with_snake = False
@@ -58,11 +123,68 @@ class Room(object):
     at_witts_end = False
 
     def __init__(self):
+        self._long_description = ''
+        self.short_description = ''
+        self.is_light = False
+        self.is_forbidden_to_pirate = False
+        self.liquid = None
         self.travel_table = []
+        self.routes = {}
+        self.forced_routes = ()
+        self.dwarf_exits = ()
+        self.hint_ns = ()  # the hints that count turns spent here
+        self.times_described = 0  # only used by games saved by 1.6
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):  # pickled by version 1.6 or earlier
+            state = dict(state)
+            state.pop('visited', None)
+        _Slotted.__setstate__(self, state)
 
     def __repr__(self):
         return '<room {} at {}>'.format(self.n, hex(id(self)))
 
+    def compile_travel(self):
+        """Index our travel table by the number of each verb it mentions.
+
+        Each verb gets the moves that the player's typing it could try,
+        in travel-table order: those listing the verb, plus the forced
+        moves, which answer to every verb.  A move whose condition fails
+        falls through to the next one, just as in the table itself.
+
+        We also list the other rooms that a dwarf or the pirate could
+        wander to from here.  They are sorted by number, not left in the
+        arbitrary order of a set, so that a seeded game always sends the
+        dwarves the same way.
+
+        """
+        table = self.travel_table
+        for move in table:
+            move.compile()
+        verb_ns = { verb.n for move in table for verb in move.verbs }
+        self.routes = { n: tuple(move for move in table if move.is_forced
+                                 or any(verb.n == n for verb in move.verbs))
+                        for n in verb_ns }
+        self.forced_routes = tuple(move for move in table if move.is_forced)
+        exits = { move.action for move in table if Dwarf.can_move(move) }
+        exits.discard(self)
+        self.dwarf_exits = tuple(sorted(exits, key=attrgetter('n')))
+
+    def moves_for(self, word):
+        """Return the moves that the travel verb `word` might take."""
+        return self.routes.get(word.n, self.forced_routes)
+
+    @property
+    def long_description(self):
+        text = self._long_description
+        if not isinstance(text, str):  # still waiting in the data file
+            text = self._long_description = str(text)
+        return text
+
+    @long_description.setter
+    def long_description(self, text):
+        self._long_description = text
+
     @property
     def is_forced(self):
         return self.travel_table and self.travel_table[0].is_forced
@@ -83,20 +205,35 @@ class Room(object):
     def is_dark(self):
         return not self.is_light
 
-class Word(object):
+class Word(_Slotted):
     """A word that can be used as part of a command."""
 
-    text = None
-    kind = None
-    default_message = None
+    __slots__ = ('n', 'text', 'kind', 'default_message', 'synonyms')
 
     def __init__(self):
+        self.text = None
+        self.kind = None
+        self.default_message = None
         self.synonyms = [ self ]
 
     def __repr__(self):
         return '<Word {}>'.format(self.text)
 
-    def __eq__(self, text):
+    # A word equals the text of each of its synonyms, and no hash could
+    # agree with all of them, so a word (like a list) cannot be hashed.
+    __hash__ = None
+
+    def __eq__(self, other):
+        # Every synonym shares the number `n`, which makes comparing two
+        # words cheap; a string still matches the text of any synonym.
+        if isinstance(other, Word):
+            return self.n == other.n
+        if isinstance(other, str):
+            return self.is_spelled(other)
+        return NotImplemented
+
+    def is_spelled(self, text):
+        """Whether `text` is the spelling of this word or a synonym."""
         return any( word.text == text for word in self.synonyms )
 
     def add_synonym(self, other):
@@ -104,9 +241,14 @@ class Word(object):
         self.synonyms.extend(other.synonyms)
         other.synonyms = self.synonyms
 
-class Object(object):
+class Object(_Slotted):
     """An object in the game, like a grate, or a rod with a rusty star."""
 
+    __slots__ = ('n', 'is_fixed', 'is_treasure', 'inventory_message',
+                 'messages', 'names', 'prop', '_rooms', 'starting_rooms',
+                 '_is_toting', 'contents',
+                 'index')  # last, so that __getstate__() can drop it
+
     def __init__(self):
         self.is_fixed = False
         self.is_treasure = False
@@ -114,63 +256,199 @@ class Object(object):
         self.messages = {}
         self.names = []
         self.prop = 0
-        self.rooms = []
+        self._rooms = ()
         self.starting_rooms = []
-        self.is_toting = False
+        self._is_toting = False
         self.contents = None  # so the bottle can hold things
+        self.index = None  # the game's `Locations`, which we keep informed
 
     def __repr__(self):
         return '<Object %d %s %x>' % (self.n, '/'.join(self.names), id(self))
 
-    def __hash__(self):
-        return self.n
+    # An object equals each of its names, and no hash could agree with
+    # all of them, so an object cannot be hashed either.
+    __hash__ = None
 
     def __eq__(self, other):
-        return any( text == other for text in self.names )
+        if isinstance(other, Object):
+            return self is other
+        if isinstance(other, str):
+            return self.is_named(other)
+        return NotImplemented
+
+    def is_named(self, text):
+        """Whether `text` is one of the names of this object."""
+        return text in self.names
+
+    @property
+    def rooms(self):
+        return self._rooms
+
+    @rooms.setter
+    def rooms(self, rooms):
+        rooms = tuple(rooms)
+        if self.index is not None:
+            self.index.move(self, self._rooms, rooms)
+        self._rooms = rooms
+
+    @property
+    def is_toting(self):
+        return self._is_toting
+
+    @is_toting.setter
+    def is_toting(self, is_toting):
+        if self.index is not None and bool(is_toting) != bool(self._is_toting):
+            self.index.set_toting(self, is_toting)
+        self._is_toting = is_toting
 
     def is_at(self, room):
-        return room in self.rooms
+        return room in self._rooms
 
     def carry(self):
-        self.rooms[:] = []
+        self.rooms = ()
         self.is_toting = True
 
     def drop(self, room):
-        self.rooms[:] = [ room ]
+        self.rooms = (room,)
         self.is_toting = False
 
     def hide(self):
-        self.rooms[:] = []
+        self.rooms = ()
         self.is_toting = False
 
     def destroy(self):
         self.hide()
 
-class Message(object):
+    def copy(self):
+        """Return a copy whose changeable state is separate from ours."""
+        obj = Object.__new__(Object)
+        obj.n = self.n
+        obj.is_fixed = self.is_fixed
+        obj.is_treasure = self.is_treasure
+        obj.inventory_message = self.inventory_message
+        obj.messages = self.messages
+        obj.names = self.names
+        obj.prop = self.prop
+        obj._rooms = self._rooms
+        obj.starting_rooms = self.starting_rooms
+        obj._is_toting = self._is_toting
+        obj.contents = self.contents
+        obj.index = None
+        return obj
+
+    def __getstate__(self):
+        return self._values(self)[:-1] + (None,)  # leave out the index
+
+    def __setstate__(self, state):
+        if 'rooms' in state:  # pickled by version 1.6 or earlier
+            state = dict(state)
+            state['_rooms'] = tuple(state.pop('rooms'))
+            state['_is_toting'] = state.pop('is_toting')
+        _Slotted.__setstate__(self, state)
+
+class Locations(object):
+    """Which objects each room holds, and which the player is carrying.
+
+    Objects report each move here, so the game can list what is in a
+    room without asking every object.  The lists stay in order of
+    object number, the order that a scan of all objects would produce.
+
+    """
+    def __init__(self, objects):
+        self.at = {}
+        self.toting = []
+        for obj in objects:
+            obj.index = self
+            for room in obj.rooms:
+                _insert(self.at.setdefault(room, []), obj)
+            if obj.is_toting:
+                _insert(self.toting, obj)
+
+    def objects_at(self, room):
+        return self.at.get(room, ())
+
+    def move(self, obj, old_rooms, new_rooms):
+        at = self.at
+        for room in old_rooms:
+            at[room].remove(obj)
+        for room in new_rooms:
+            _insert(at.setdefault(room, []), obj)
+
+    def set_toting(self, obj, is_toting):
+        if is_toting:
+            _insert(self.toting, obj)
+        else:
+            self.toting.remove(obj)
+
+def _insert(objects, obj):
+    i = len(objects)
+    while i and objects[i - 1].n > obj.n:
+        i -= 1
+    objects.insert(i, obj)
+
+class Message(_Slotted):
     """A message for printing."""
-    text = ''
+
+    __slots__ = ('n', '_text')
+
+    def __init__(self):
+        self._text = ''
+
+    @property
+    def text(self):
+        text = self._text
+        if not isinstance(text, str):  # still waiting in the data file
+            text = self._text = str(text)
+        return text
+
+    @text.setter
+    def text(self, text):
+        self._text = text
 
     def __str__(self):
         return self.text
 
-class Hint(object):
+class Hint(_Slotted):
     """A hint offered if the player loiters in one area too long."""
 
-    turns_needed = 0
-    turn_counter = 0
-    penalty = 0
-    question = None
-    message = None
-    used = False
+    __slots__ = ('n', 'turns_needed', 'turn_counter', 'penalty', 'question',
+                 'message', 'used', 'rooms')
 
     def __init__(self):
+        self.turns_needed = 0
+        self.turn_counter = 0
+        self.penalty = 0
+        self.question = None
+        self.message = None
+        self.used = False
         self.rooms = []
 
-class Dwarf(object):
+    def copy(self):
+        """Return a copy whose counter and flag are separate from ours."""
+        hint = Hint.__new__(Hint)
+        hint.n = self.n
+        hint.turns_needed = self.turns_needed
+        hint.turn_counter = self.turn_counter
+        hint.penalty = self.penalty
+        hint.question = self.question
+        hint.message = self.message
+        hint.used = self.used
+        hint.rooms = self.rooms
+        return hint
+
+    def index_rooms(self):
+        """Tell each of our rooms that turns spent there count toward us."""
+        if self.turns_needed != 9999:  # 9999 means never offered
+            for room in self.rooms:
+                room.hint_ns += (self.n,)
+
+class Dwarf(_Slotted):
+    __slots__ = ('room', 'old_room', 'has_seen_adventurer')
+
     is_dwarf = True
     is_pirate = False
 
-    def __init__(self, room):
+    def __init__(self, room=None):
         self.start_at(room)
         self.has_seen_adventurer = False
 
@@ -178,7 +456,15 @@ class Dwarf(object):
         self.room = room
         self.old_room = room
 
-    def can_move(self, move):
+    def copy(self):
+        dwarf = self.__class__.__new__(self.__class__)
+        dwarf.room = self.room
+        dwarf.old_room = self.old_room
+        dwarf.has_seen_adventurer = self.has_seen_adventurer
+        return dwarf
+
+    @staticmethod
+    def can_move(move):
         if not isinstance(move.action, Room):
             return False
         room = move.action
@@ -187,5 +473,7 @@ class Dwarf(object):
                 and not move.condition == ('%', 100))
 
 class Pirate(Dwarf):
+    __slots__ = ()
+
     is_dwarf = False
     is_pirate = True
@@ -0,0 +1,154 @@
+"""Host Adventure games from a pool of pre-forked worker processes.
+
+Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
+Apache License, Version 2.0 as detailed in the accompanying README.txt.
+
+"""
+import asyncio
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from . import load_world
+from .server import BACKLOG, Server
+
+log = logging.getLogger(__name__)
+
+MIN_LIFETIME = 1.0  # a worker that dies younger is restarted after a pause
+
+class Pool(object):
+    """A supervisor that shares players among several worker processes.
+
+    The world is loaded here, once, before any worker is forked, so
+    every worker begins with it already in memory that the operating
+    system shares between them copy-on-write; its long text stays in
+    the memory map of ``advent.dat`` that all of them share anyway.
+    Freezing the garbage collector keeps the collections in each worker
+    from touching, and thus copying, the pages that the world lives in.
+
+    Every worker accepts connections from the same listening socket,
+    so a session stays with the worker that accepted it from start to
+    finish.  A worker that exits, unless the pool is being stopped, is
+    replaced by a fresh one.
+
+    """
+    def __init__(self, workers=0, host='127.0.0.1', port=0,
+                 max_sessions=10000, max_resident=None, ready_games=0):
+        self.workers = workers or os.cpu_count() or 1
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.max_resident = max_resident
+        self.ready_games = ready_games
+        self.sock = None
+        self.pids = {}  # pid -> (worker number, time it started)
+        self.restarts = 0
+        self.stopping = False
+
+    def start(self):
+        """Load the world, start listening, and fork the workers."""
+        if not hasattr(os, 'fork'):
+            raise RuntimeError('a worker pool needs os.fork()')
+        load_world()
+        gc.collect()
+        gc.freeze()
+        self.sock = socket.create_server((self.host, self.port),
+                                         backlog=BACKLOG)
+        self.port = self.sock.getsockname()[1]
+        for i in range(self.workers):
+            self.spawn(i)
+        return self
+
+    def spawn(self, i):
+        """Fork worker number `i`."""
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                self.serve()
+                status = 0
+            except BaseException:
+                log.exception('worker %d crashed', i)
+            finally:
+                os._exit(status)
+        self.pids[pid] = (i, time.monotonic())
+
+    def serve(self):
+        """Run a worker's share of the games until sent SIGTERM."""
+        # Control-C reaches the whole process group; leave it to the
+        # supervisor to decide when the workers stop.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        sessions = -(-self.max_sessions // self.workers)
+        resident = self.max_resident and -(-self.max_resident // self.workers)
+
+        async def run():
+            server = Server(max_sessions=sessions, max_resident=resident,
+                            ready_games=self.ready_games)
+            await server.start(self.sock)
+            stopped = asyncio.Event()
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, stopped.set)
+            await stopped.wait()
+            await server.close()
+
+        asyncio.run(run())
+
+    def reap(self):
+        """Wait for a worker to exit and, unless stopping, replace it.
+
+        Returns the pid of the worker that exited.
+
+        """
+        pid, status = os.waitpid(-1, 0)
+        i, started = self.pids.pop(pid)
+        if not self.stopping:
+            log.warning('worker %d (pid %d) exited with status %d;'
+                        ' restarting it', i, pid,
+                        _exit_code(status))
+            if time.monotonic() - started < MIN_LIFETIME:
+                time.sleep(MIN_LIFETIME)  # rather than restart in a loop
+            self.restarts += 1
+            self.spawn(i)
+        return pid
+
+    def stop(self):
+        """Ask every worker to finish, wait for them, and stop listening."""
+        self.stopping = True
+        for pid in list(self.pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in list(self.pids):
+            os.waitpid(pid, 0)
+            del self.pids[pid]
+        self.sock.close()
+
+    def run(self):
+        """Serve games and supervise the workers until interrupted."""
+        self.start()
+        print('Adventure is listening on {}:{} with {} workers'.format(
+            self.host, self.port, self.workers), file=sys.stderr)
+        signal.signal(signal.SIGTERM, _interrupt)
+        try:
+            while True:
+                self.reap()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt()
+
+def _exit_code(status):
+    """Decode a status from `os.waitpid()` as the shell would report it."""
+    if hasattr(os, 'waitstatus_to_exitcode'):
+        return os.waitstatus_to_exitcode(status)
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
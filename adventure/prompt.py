@@ -4,14 +4,17 @@ Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
 Apache License, Version 2.0 as detailed in the accompanying README.txt.
 
 """
-import inspect
+import sys
 
 class ReprTriggeredPhrase(object):
     """Command that happens when Python calls repr() to print them."""
 
+    __slots__ = ('game', 'words', 'longer')
+
     def __init__(self, game, words):
         self.game = game
         self.words = tuple(words)  # protect against caller changing list
+        self.longer = None  # phrases that extend this one, once asked for
 
     def __repr__(self):
         """Run this command and return the message that results."""
@@ -26,17 +29,54 @@ class ReprTriggeredPhrase(object):
         return ReprTriggeredPhrase(self.game, self.words + words)
 
     def __getattr__(self, name):
-        return ReprTriggeredPhrase(self.game, self.words + (name,))
-
-
-def install_words(game):
-    # stack()[0] is this; stack()[1] is adventure.play(); so, stack()[2]
-    namespace = inspect.stack()[2][0].f_globals
-    words = [ k for k in game.vocabulary if isinstance(k, str) ]
-    words.append('yes')
-    words.append('no')
-    for word in words:
-        identifier = ReprTriggeredPhrase(game, [ word ])
-        namespace[word] = identifier
-        if len(word) > 5:
-            namespace[word[:5]] = identifier
+        longer = self.longer
+        if longer is None:
+            longer = self.longer = {}
+        phrase = longer.get(name)
+        if phrase is None:
+            phrase = longer[name] = ReprTriggeredPhrase(
+                self.game, self.words + (name,))
+        return phrase
+
+class Words(dict):
+    """The game's words as phrases, each made the first time it is asked for.
+
+    Like the game's vocabulary, this knows five-letter truncations, so
+    ``inven`` works as well as ``inventory``.  Looking a word up, as
+    ``adventure.look`` does, makes only that phrase; but `install()`
+    makes them all at once, since a namespace like the globals of the
+    Python prompt is a plain dictionary that cannot make names on demand.
+
+    """
+    def __init__(self, game):
+        self.game = game
+        self.names = [ k for k in game.vocabulary if isinstance(k, str) ]
+        self.names.extend(('yes', 'no'))
+
+    def __missing__(self, name):
+        if name not in self.game.vocabulary and name not in ('yes', 'no'):
+            raise KeyError(name)
+        phrase = self[name] = ReprTriggeredPhrase(self.game, [ name ])
+        return phrase
+
+    def install(self, namespace):
+        """Define every word as a global name in `namespace`, making a
+        phrase for each word that has not been asked for yet."""
+        game = self.game
+        self.update((name, ReprTriggeredPhrase(game, (name,)))
+                    for name in self.names if name not in self)
+        namespace.update(self)
+
+def install_words(game, namespace=None):
+    """Define the words of `game` in `namespace`, and return the `Words`.
+
+    Without a `namespace`, the words go into the globals of whoever
+    called our caller, which is usually the Python prompt that called
+    `adventure.play()` or `adventure.resume()`.
+
+    """
+    if namespace is None:
+        namespace = sys._getframe(2).f_globals
+    words = Words(game)
+    words.install(namespace)
+    return words
@@ -0,0 +1,165 @@
+"""Replay scripts of Adventure commands against many random seeds.
+
+Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
+Apache License, Version 2.0 as detailed in the accompanying README.txt.
+
+"""
+import argparse
+import os
+import re
+import sys
+import time
+import traceback
+from collections import namedtuple
+from . import load_world
+from .game import Game
+
+Result = namedtuple('Result', 'script seed transcript score max_score'
+                    ' turns error elapsed')
+Result.__doc__ = """The outcome of replaying one script with one seed.
+
+`transcript` is a list alternating the output of the game with each
+command that was typed, starting with the welcome message.  `error`
+is the traceback of any exception the game raised, or None.
+
+"""
+
+def parse_script(lines):
+    """Return the commands in `lines`, skipping # comments and lines
+    without any words, which the interactive loop would ignore too."""
+    commands = []
+    for line in lines:
+        if line.lstrip().startswith('#'):
+            continue
+        words = re.findall(r'\w+', line.lower())
+        if words:
+            commands.append(words)
+    return commands
+
+def read_script(path):
+    """Return the commands in the script file at `path`."""
+    with open(path) as f:
+        return parse_script(f)
+
+def parse_seeds(text):
+    """Parse seeds like ``7``, ``1,2,3``, or the inclusive range ``0-99``."""
+    seeds = []
+    for part in text.split(','):
+        first, dash, last = part.partition('-')
+        if dash:
+            seeds.extend(range(int(first), int(last) + 1))
+        else:
+            seeds.append(int(first))
+    return seeds
+
+def replay(commands, seed=None, script=None):
+    """Play `commands` in a new game and return a `Result`."""
+    t0 = time.perf_counter()
+    game = Game(seed)
+    game.attach(load_world())
+    transcript = []
+    error = None
+    try:
+        game.start()
+        transcript.append(game.output)
+        for words, output in zip(commands, game.iter_commands(commands)):
+            transcript.append(' '.join(words))
+            transcript.append(output)
+    except Exception:
+        error = traceback.format_exc()
+    score, max_score = game.compute_score(
+        for_score_command=not game.is_finished)
+    return Result(script, seed, transcript, score, max_score, game.turns,
+                  error, time.perf_counter() - t0)
+
+def format_transcript(transcript):
+    """Turn a `Result.transcript` into text like a terminal session."""
+    lines = [ transcript[0] ]
+    for i in range(1, len(transcript), 2):
+        lines.append('> {}\n'.format(transcript[i]))
+        lines.extend(transcript[i+1:i+2])
+    return ''.join(lines)
+
+# Running many replays across a pool of worker processes.
+
+_scripts = None
+
+def _start_worker(scripts):
+    global _scripts
+    _scripts = scripts
+    load_world()  # once per worker, not once per replay
+
+def _replay_task(task):
+    script, seed = task
+    return replay(_scripts[script], seed, script)
+
+def replay_many(scripts, seeds, processes=None):
+    """Replay every script in `scripts` with every seed in `seeds`.
+
+    `scripts` maps script names to lists of commands.  Results are
+    yielded in order: every seed for the first script, then for the
+    second, and so forth.  With `processes` of 1 everything runs here
+    in this process; otherwise a pool of that many workers is used,
+    defaulting to one per CPU.
+
+    """
+    tasks = [ (script, seed) for script in scripts for seed in seeds ]
+    if processes == 1:
+        _start_worker(scripts)
+        for task in tasks:
+            yield _replay_task(task)
+        return
+
+    import multiprocessing
+
+    processes = processes or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (processes * 8))
+    with multiprocessing.Pool(processes, _start_worker, (scripts,)) as pool:
+        for result in pool.imap(_replay_task, tasks, chunksize):
+            yield result
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description='Replay Adventure command scripts across many seeds.',
+        prog='{} -m adventure.replay'.format(os.path.basename(sys.executable)))
+    parser.add_argument('scripts', nargs='+', metavar='SCRIPT',
+                        help='file with one command per line')
+    parser.add_argument('--seeds', default='0', type=parse_seeds,
+                        help='seeds like 7, 1,2,3, or 0-99 (default 0)')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--transcripts', metavar='DIRECTORY',
+                        help='write each transcript to SCRIPT-SEED.txt here')
+    parser.add_argument('--verbose', action='store_true',
+                        help='print a line for every run')
+    args = parser.parse_args(argv)
+
+    scripts = { path: read_script(path) for path in args.scripts }
+    if args.transcripts:
+        os.makedirs(args.transcripts, exist_ok=True)
+
+    t0 = time.perf_counter()
+    runs = errors = 0
+    for result in replay_many(scripts, args.seeds, args.processes):
+        runs += 1
+        if result.error:
+            errors += 1
+        if args.verbose or result.error:
+            print('{} seed {}: score {}/{} in {} turns{}'.format(
+                result.script, result.seed, result.score, result.max_score,
+                result.turns, ' FAILED' if result.error else ''))
+        if result.error:
+            print(result.error, end='')
+        if args.transcripts:
+            name = '{}-{}.txt'.format(
+                os.path.basename(result.script), result.seed)
+            with open(os.path.join(args.transcripts, name), 'w') as f:
+                f.write(format_transcript(result.transcript))
+    elapsed = time.perf_counter() - t0
+
+    print('{} runs, {} failed, in {:.2f} s ({:.0f} runs/s)'.format(
+        runs, errors, elapsed, runs / elapsed if elapsed else 0))
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
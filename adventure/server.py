@@ -0,0 +1,307 @@
+"""Host many Adventure games at once over a telnet-style line protocol.
+
+Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
+Apache License, Version 2.0 as detailed in the accompanying README.txt.
+
+"""
+import argparse
+import asyncio
+import logging
+import re
+import sys
+from . import load_world, new_game
+
+log = logging.getLogger(__name__)
+
+PROMPT = b'\r\n> '       # ends every reply, so clients know it is complete
+MAX_LINE = 1024         # longer input lines are discarded, not buffered
+HIGH_WATER = 64 * 1024  # pause a session whose client stops reading output
+BACKLOG = 4096          # so a crowd of players arriving at once is not refused
+
+SAVING_REFUSED = 'SAVING IS NOT AVAILABLE ON THIS SERVER.\n'
+COLLAPSED = 'THE CAVE HAS COLLAPSED.  PLEASE START A NEW GAME.\n'
+
+# Telnet clients sprinkle option negotiation into their input; strip it.
+TELNET_COMMAND = re.compile(
+    br'\xff(?:\xfa.*?\xff\xf0|[\xfb-\xfe].|[\xf0-\xff])', re.S)
+
+def parse_line(line):
+    """Turn a line of input bytes into a list of command words."""
+    line = TELNET_COMMAND.sub(b'', line).decode('ascii', 'ignore')
+    return re.findall(r'\w+', line.lower())
+
+def refusal(words):
+    """Return why the server will not run `words`, or None if it will."""
+    word = load_world().vocabulary.get(words[0])
+    if word is not None and word.is_spelled('suspend'):
+        # Saving would let players write files on the server.
+        return SAVING_REFUSED
+    return None
+
+def encode(output):
+    """Turn game output into bytes for a telnet client, prompt included."""
+    output = output.rstrip('\n').replace('\n', '\r\n')
+    return output.encode('ascii', 'replace') + PROMPT
+
+class Server(object):
+    """A TCP server that gives every connection its own game.
+
+    Each session handles a single line and then yields to the event
+    loop, whose ready queue is first-in first-out, so sessions take
+    turns and one client pipelining hundreds of commands cannot starve
+    the others.  A session whose client stops reading output waits
+    for its transport buffer to drain below `high_water` before reading
+    another command.
+
+    Games are kept in `games`, a dictionary keyed by session number.
+    Given `max_resident`, it is instead a `SessionCache` that keeps
+    only that many games in memory and spills those idle longest to
+    disk, so that memory stays bounded however many players connect.
+    Given `ready_games`, that many games are kept already started by a
+    `GameFactory`, so a player who connects need not wait for one.
+
+    """
+    def __init__(self, host='127.0.0.1', port=0, max_sessions=10000,
+                 high_water=HIGH_WATER, seed=None, max_resident=None,
+                 ready_games=0):
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.high_water = high_water
+        self.seed = seed
+        self.active_sessions = 0
+        self.total_sessions = 0
+        self.total_commands = 0
+        self.server = None
+        self.sessions = {}  # task -> writer, for every connected player
+        if max_resident is None:
+            self.games = {}
+        else:
+            from .sessions import SessionCache
+            self.games = SessionCache(max_resident)
+        if ready_games:
+            from .factory import GameFactory
+            self.factory = GameFactory(ready_games)
+        else:
+            self.factory = None
+
+    async def start(self, sock=None):
+        """Start listening, on the already-bound `sock` if one is given."""
+        load_world()  # parse advent.dat before the first player arrives
+        if self.factory is not None:
+            self.factory.start()
+        if sock is None:
+            self.server = await asyncio.start_server(
+                self.handle, self.host, self.port, limit=MAX_LINE,
+                backlog=BACKLOG)
+        else:
+            self.server = await asyncio.start_server(
+                self.handle, sock=sock, limit=MAX_LINE)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        """Stop accepting players, hang up on current ones, and wait."""
+        self.server.close()
+        tasks = list(self.sessions)
+        for writer in self.sessions.values():
+            writer.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.server.wait_closed()
+        if not isinstance(self.games, dict):
+            self.games.close()
+        if self.factory is not None:
+            self.factory.close()
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def handle(self, reader, writer):
+        writer.transport.set_write_buffer_limits(high=self.high_water)
+        if self.active_sessions >= self.max_sessions:
+            writer.write(b'THE CAVE IS FULL.  PLEASE TRY AGAIN LATER.\r\n')
+            await self.hang_up(writer)
+            return
+
+        sid = self.total_sessions
+        seed = self.seed
+        if seed is not None:
+            seed += sid
+        self.active_sessions += 1
+        self.total_sessions += 1
+        task = asyncio.current_task()
+        self.sessions[task] = writer
+        try:
+            writer.write(encode(await self.open_session(sid, seed)))
+            await writer.drain()
+            finished = False
+            while not finished:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    continue  # line exceeded MAX_LINE and was discarded
+                if not line:
+                    break
+                output, finished = await self.play(sid, parse_line(line))
+                writer.write(encode(output))
+                await writer.drain()
+                await asyncio.sleep(0)  # let the other sessions take a turn
+        except ConnectionError:
+            pass
+        finally:
+            self.active_sessions -= 1
+            del self.sessions[task]
+            await self.close_session(sid)
+            await self.hang_up(writer)
+
+    # Where the games are kept; a subclass can keep them elsewhere.
+
+    async def open_session(self, sid, seed):
+        """Start a game for session `sid`, and return its greeting."""
+        game = self.games[sid] = self.new_game(seed)
+        return game.output
+
+    async def play(self, sid, words):
+        """Run `words` for session `sid`; return the output, and whether
+        the game is now finished."""
+        game = self.games[sid]
+        return self.run(game, words), game.is_finished
+
+    async def close_session(self, sid):
+        if sid in self.games:
+            del self.games[sid]  # without reading back a spilled game
+
+    def new_game(self, seed):
+        """Return a started game, from the factory if there is one."""
+        if self.factory is not None:
+            return self.factory.new_game(seed)
+        return new_game(seed)
+
+    def run(self, game, words):
+        """Run one command for a session and return the game output."""
+        if not words:
+            return ''
+        refused = refusal(words)
+        if refused:
+            return refused
+        self.total_commands += 1
+        try:
+            return game.do_command(words)
+        except Exception:
+            log.exception('game crashed running %r', words)
+            game.is_done = True
+            game.yesno_callback = None
+            return COLLAPSED
+
+    async def hang_up(self, writer):
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+class Client(object):
+    """A scripted stand-in for a telnet player, for tests and benchmarks."""
+
+    def __init__(self, reader, writer, greeting):
+        self.reader = reader
+        self.writer = writer
+        self.greeting = greeting
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=0):
+        reader, writer = await asyncio.open_connection(host, port)
+        self = cls(reader, writer, None)
+        self.greeting = await self.read_reply()
+        return self
+
+    async def read_reply(self):
+        """Return the next reply, or what arrived before the server hung up."""
+        try:
+            data = await self.reader.readuntil(PROMPT)
+            data = data[:-len(PROMPT)]
+        except asyncio.IncompleteReadError as e:
+            data = e.partial
+        return data.decode('ascii').replace('\r\n', '\n').rstrip('\n')
+
+    async def send(self, line):
+        """Send a command line and return the reply, without its prompt."""
+        self.writer.write(line.encode('ascii') + b'\r\n')
+        await self.writer.drain()
+        return await self.read_reply()
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description='Host Adventure games for telnet clients.',
+        prog='{} -m adventure.server'.format(sys.executable))
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='address to listen on (default %(default)s)')
+    parser.add_argument('--port', type=int, default=7777,
+                        help='port to listen on (default %(default)s)')
+    parser.add_argument('--max-sessions', type=int, default=10000,
+                        help='most simultaneous games (default %(default)s)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed the first game, and following games'
+                        ' with successive integers')
+    parser.add_argument('--max-resident', type=int, default=None,
+                        help='most games to keep in memory, spilling the'
+                        ' idlest to disk (default: no limit)')
+    parser.add_argument('--ready-games', type=int, default=0,
+                        help='started games to keep waiting for new players'
+                        ' in each worker (default %(default)s)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='worker processes to share the players among,'
+                        ' or 0 for one per CPU (default %(default)s)')
+    parser.add_argument('--shards', type=int, default=0,
+                        help='worker processes to keep the games in, each'
+                        ' session routed to one by consistent hashing'
+                        ' (default: keep them in this process)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig()
+    if args.shards:
+        if args.workers != 1:
+            parser.error('--shards cannot be combined with --workers')
+        if args.max_resident is not None or args.ready_games:
+            parser.error('--shards cannot be combined with --max-resident'
+                         ' or --ready-games')
+    if args.workers != 1:
+        if args.seed is not None:
+            parser.error('--seed needs a single worker')
+        from .pool import Pool
+        pool = Pool(args.workers, args.host, args.port, args.max_sessions,
+                    args.max_resident, args.ready_games)
+        pool.run()
+        return
+
+    async def run():
+        if args.shards:
+            from .shard import ShardedServer
+            server = ShardedServer(args.shards, host=args.host,
+                                   port=args.port,
+                                   max_sessions=args.max_sessions,
+                                   seed=args.seed)
+        else:
+            server = Server(args.host, args.port, args.max_sessions,
+                            seed=args.seed, max_resident=args.max_resident,
+                            ready_games=args.ready_games)
+        await server.start()
+        print('Adventure is listening on {}:{}'.format(
+            args.host, server.port), file=sys.stderr)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,123 @@
+"""Keep only the most recently played games in memory.
+
+Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
+Apache License, Version 2.0 as detailed in the accompanying README.txt.
+
+"""
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from .game import Game
+
+class SessionCache(MutableMapping):
+    """A mapping of session ids to games that spills idle games to disk.
+
+    At most `max_resident` games are kept in memory.  When another one
+    arrives, the least recently used game is written to `directory`
+    in the same format as the ``save`` command, and is read back the
+    next time that its session is looked up.  Each resident game costs
+    roughly 25 kB, and each spilled game about 3 kB of disk.  Without
+    a `directory`, a temporary one is made and then removed by `close()`.
+
+    The count of resident games is the only bound: neither memory nor
+    disk is limited in bytes, though `stats()` reports the disk used.
+    A game that cannot be read back stays spilled, file and all, and
+    its lookup raises the error; deleting it does not read it.
+
+    """
+    def __init__(self, max_resident=1000, directory=None):
+        if max_resident < 1:
+            raise ValueError('max_resident must be at least 1')
+        self.max_resident = max_resident
+        self.is_temporary = directory is None
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix='adventure-')
+        else:
+            os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.resident = OrderedDict()  # session id -> game, oldest first
+        self.spilled = {}              # session id -> (path, size)
+        self.count = 0                 # files written so far, to name them
+        self.hits = 0         # lookups that found the game in memory
+        self.loads = 0        # lookups that read the game back from disk
+        self.evictions = 0    # games written out to disk
+
+    def __getitem__(self, sid):
+        game = self.resident.get(sid)
+        if game is not None:
+            self.resident.move_to_end(sid)
+            self.hits += 1
+            return game
+        path, size = self.spilled[sid]
+        game = Game.resume(path)  # if this fails, the session stays spilled
+        del self.spilled[sid]
+        os.remove(path)
+        self.loads += 1
+        self.resident[sid] = game
+        self.evict()
+        return game
+
+    def __setitem__(self, sid, game):
+        self.discard_spilled(sid)
+        self.resident[sid] = game
+        self.resident.move_to_end(sid)
+        self.evict()
+
+    def __delitem__(self, sid):
+        if self.resident.pop(sid, None) is None:
+            if not self.discard_spilled(sid):
+                raise KeyError(sid)
+
+    def __contains__(self, sid):
+        return sid in self.resident or sid in self.spilled
+
+    def __iter__(self):
+        yield from list(self.resident)
+        yield from list(self.spilled)
+
+    def __len__(self):
+        return len(self.resident) + len(self.spilled)
+
+    def discard_spilled(self, sid):
+        entry = self.spilled.pop(sid, None)
+        if entry is not None:
+            os.remove(entry[0])
+        return entry is not None
+
+    def evict(self):
+        """Write out the least recently used games until few enough remain."""
+        resident = self.resident
+        while len(resident) > self.max_resident:
+            sid, game = resident.popitem(last=False)
+            self.spill(sid, game)
+
+    def spill(self, sid, game):
+        """Write `game` to disk as the session `sid`."""
+        path = os.path.join(self.directory, '{}.save'.format(self.count))
+        self.count += 1
+        with open(path, 'wb') as f:
+            game.save(f)
+            size = f.tell()
+        self.spilled[sid] = (path, size)
+        self.evictions += 1
+
+    def stats(self):
+        """Return a dictionary of counts describing the cache."""
+        return {
+            'resident': len(self.resident),
+            'spilled': len(self.spilled),
+            'spilled_bytes': sum(size for path, size in self.spilled.values()),
+            'hits': self.hits,
+            'loads': self.loads,
+            'evictions': self.evictions,
+            }
+
+    def close(self):
+        """Forget every game, removing the temporary directory if any."""
+        for sid in list(self.spilled):
+            self.discard_spilled(sid)
+        self.resident.clear()
+        if self.is_temporary:
+            shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,452 @@
+"""Spread sessions across worker processes by consistent hashing.
+
+Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
+Apache License, Version 2.0 as detailed in the accompanying README.txt.
+
+"""
+import asyncio
+import bisect
+import collections
+import hashlib
+import logging
+import os
+import pickle
+import socket
+import struct
+import sys
+import time
+import traceback
+from . import load_world, new_game
+from .pool import MIN_LIFETIME
+from .server import COLLAPSED, Server, refusal
+
+log = logging.getLogger(__name__)
+
+REPLICAS = 64         # points that each worker gets on the ring
+MIGRATE_BATCH = 16    # sessions moved per request, so others can interleave
+HEADER = struct.Struct('!I')
+
+def _hash(key):
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+class HashRing(object):
+    """Map keys to nodes so that adding or removing a node moves few keys.
+
+    Each node is hashed to `replicas` points around a ring, and a key
+    belongs to the node at the first point at or after its own hash.
+    Adding a node takes over only the keys just before its points, and
+    removing one hands its keys to the nodes after them, so about 1/N
+    of the keys move when an Nth node comes or goes.
+
+    """
+    def __init__(self, nodes=(), replicas=REPLICAS):
+        self.replicas = replicas
+        self.nodes = set()
+        self.points = []  # sorted hashes
+        self.owners = []  # node at each point
+        for node in nodes:
+            self.add(node)
+
+    def copy(self):
+        ring = HashRing(replicas=self.replicas)
+        ring.nodes = set(self.nodes)
+        ring.points = list(self.points)
+        ring.owners = list(self.owners)
+        return ring
+
+    def add(self, node):
+        self.nodes.add(node)
+        for i in range(self.replicas):
+            point = _hash('{}#{}'.format(node, i))
+            j = bisect.bisect(self.points, point)
+            self.points.insert(j, point)
+            self.owners.insert(j, node)
+
+    def remove(self, node):
+        self.nodes.remove(node)
+        keep = [ j for j, owner in enumerate(self.owners) if owner != node ]
+        self.points = [ self.points[j] for j in keep ]
+        self.owners = [ self.owners[j] for j in keep ]
+
+    def node_for(self, key):
+        """Return the node that `key` belongs to."""
+        if not self.points:
+            raise LookupError('the ring has no nodes')
+        j = bisect.bisect_left(self.points, _hash(key))
+        return self.owners[j % len(self.owners)]
+
+# The workers, which each keep their sessions' games in memory and
+# answer one request at a time from the router, in the order sent.
+
+def _handle(games, request):
+    kind = request[0]
+    if kind == 'command':
+        sid, words = request[1:]
+        game = games[sid]
+        output = game.do_command(words)
+        if game.is_finished:
+            del games[sid]
+        return output, game.is_finished
+    if kind == 'new':
+        sid, seed = request[1:]
+        game = games[sid] = new_game(seed)
+        return game.output
+    if kind == 'export':
+        states = {}
+        for sid in request[1]:
+            game = games.pop(sid, None)
+            if game is not None:  # else it finished while waiting to move
+                states[sid] = pickle.dumps(game, pickle.HIGHEST_PROTOCOL)
+        return states
+    if kind == 'import':
+        for sid, state in request[1].items():
+            games[sid] = pickle.loads(state)
+        return None
+    if kind == 'end':
+        games.pop(request[1], None)
+        return None
+    if kind == 'ping':
+        return None
+    raise ValueError('unknown request {!r}'.format(kind))
+
+def _serve(sock):
+    """Answer requests from the router on `sock` until it hangs up."""
+    load_world()
+    games = {}
+    f = sock.makefile('rwb')
+    while True:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            break
+        request = pickle.loads(f.read(HEADER.unpack(header)[0]))
+        if request[0] == 'stop':
+            break
+        try:
+            reply = (True, _handle(games, request))
+        except Exception:
+            reply = (False, traceback.format_exc())
+        data = pickle.dumps(reply, pickle.HIGHEST_PROTOCOL)
+        f.write(HEADER.pack(len(data)) + data)
+        f.flush()
+
+def _worker_environment():
+    """Return an environment in which a worker can import this package."""
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    path = env.get('PYTHONPATH')
+    env['PYTHONPATH'] = root if not path else root + os.pathsep + path
+    return env
+
+class Worker(object):
+    """The router's end of the connection to one worker process."""
+
+    def __init__(self, name, process, reader, writer):
+        self.name = name
+        self.process = process
+        self.reader = reader
+        self.writer = writer
+        self.waiting = collections.deque()  # a future for each request
+        self.replies = asyncio.ensure_future(self.read_replies())
+        self.started = time.monotonic()
+
+    def request(self, *request):
+        """Send `request`, and return a future for the worker's reply.
+
+        Raises `ConnectionError` if the worker has already hung up.
+
+        """
+        if self.replies.done():
+            raise ConnectionError('worker {} hung up'.format(self.name))
+        data = pickle.dumps(request, pickle.HIGHEST_PROTOCOL)
+        self.writer.write(HEADER.pack(len(data)) + data)
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.append(future)
+        return future
+
+    async def read_replies(self):
+        try:
+            while True:
+                header = await self.reader.readexactly(HEADER.size)
+                data = await self.reader.readexactly(HEADER.unpack(header)[0])
+                ok, value = pickle.loads(data)
+                future = self.waiting.popleft()
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(RuntimeError(
+                        'worker {} failed:\n{}'.format(self.name, value)))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            while self.waiting:
+                self.waiting.popleft().set_exception(ConnectionError(
+                    'worker {} hung up'.format(self.name)))
+
+    async def stop(self):
+        if not self.replies.done():
+            self.request('stop')
+            self.waiting.pop().cancel()  # no reply is sent to a stop
+        self.writer.close()
+        await self.replies
+        await self.process.wait()
+
+class Router(object):
+    """Route each session's commands to the worker process that owns it.
+
+    Sessions are assigned to workers with a `HashRing`, so adding or
+    removing a worker moves only the sessions whose owner changes.
+    Each of those is snapshotted on its old worker and rebuilt on its
+    new one, a batch at a time, while the rest keep playing.  Until its
+    batch starts, a session is still played on its old worker, so a
+    player waits at most for their own batch to arrive.  Every game can
+    be snapshotted, even one that is waiting for an answer.
+
+    Workers are started as new Python processes rather than forked, so
+    that a worker can be added at any time, even once threads are
+    running in this process, as they are whenever asyncio has looked up
+    a host name or waited for a child process.
+
+    A worker that dies takes its games with it.  Its sessions are
+    forgotten, its share of the ring passes to the other workers, and a
+    new worker is started to take its place.
+
+    """
+    def __init__(self):
+        self.ring = HashRing()
+        self.workers = {}   # name -> Worker
+        self.sessions = set()
+        self.moving = {}    # session id -> Event set once it has moved
+        self.pending = {}   # session id -> old worker, until its batch moves
+        self.moved = 0      # sessions migrated so far
+        self.count = 0      # workers started so far, to name the next
+        self.restarts = 0   # workers started to replace ones that died
+        self.replacing = set()  # tasks starting those replacements
+        self.rebalancing = asyncio.Lock()
+
+    async def start(self, workers=2):
+        for i in range(workers):
+            await self.add_worker()
+        return self
+
+    async def close(self):
+        for task in list(self.replacing):
+            task.cancel()
+        await asyncio.gather(*self.replacing, return_exceptions=True)
+        for name in list(self.workers):
+            await self.workers.pop(name).stop()
+
+    async def add_worker(self):
+        """Start another worker, move its share of sessions to it, and
+        return its name."""
+        name = 'worker-{}'.format(self.count)
+        self.count += 1
+        ours, theirs = socket.socketpair()
+        try:
+            # The worker inherits only its own end of its own connection.
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, '-m', __name__, str(theirs.fileno()),
+                pass_fds=(theirs.fileno(),), env=_worker_environment())
+        except BaseException:
+            ours.close()
+            raise
+        finally:
+            theirs.close()
+        reader, writer = await asyncio.open_connection(sock=ours)
+        worker = self.workers[name] = Worker(name, process, reader, writer)
+        worker.replies.add_done_callback(lambda f: self.lose_worker(worker))
+        await worker.request('ping')  # so no session waits for it to start
+        async with self.rebalancing:
+            ring = self.ring.copy()
+            ring.add(name)
+            await self.rebalance(ring)
+        return name
+
+    async def remove_worker(self, name):
+        """Move every session off worker `name`, then stop it."""
+        async with self.rebalancing:
+            ring = self.ring.copy()
+            ring.remove(name)
+            await self.rebalance(ring)
+            await self.workers.pop(name).stop()
+
+    def lose_worker(self, worker):
+        """Forget a worker that hung up, unless it was asked to stop."""
+        name = worker.name
+        if self.workers.get(name) is not worker:
+            return  # it was removed first, and then stopped
+        del self.workers[name]
+        lost = []
+        if self.ring.nodes:
+            for sid in self.sessions:
+                if (self.pending.get(sid) or self.ring.node_for(sid)) == name:
+                    lost.append(sid)
+        for sid in lost:
+            self.sessions.discard(sid)
+            self.pending.pop(sid, None)
+        if name in self.ring.nodes:
+            ring = self.ring.copy()
+            ring.remove(name)
+            self.ring = ring
+        log.warning('worker %s (pid %d) died, losing %d sessions;'
+                    ' replacing it', name, worker.process.pid, len(lost))
+        task = asyncio.ensure_future(self.replace_worker(worker))
+        self.replacing.add(task)
+        task.add_done_callback(self.replacing.discard)
+
+    async def replace_worker(self, worker):
+        worker.writer.close()
+        await worker.process.wait()
+        if time.monotonic() - worker.started < MIN_LIFETIME:
+            await asyncio.sleep(MIN_LIFETIME)  # rather than restart in a loop
+        self.restarts += 1
+        try:
+            await self.add_worker()
+        except ConnectionError:
+            pass  # it died too, and is being replaced in turn
+        except Exception:
+            log.exception('cannot replace worker %s', worker.name)
+
+    def owner(self, sid):
+        name = self.pending.get(sid)
+        return self.workers[name or self.ring.node_for(sid)]
+
+    async def rebalance(self, ring):
+        """Switch to `ring`, moving the sessions whose owner changes."""
+        moves = collections.defaultdict(list)
+        if self.ring.nodes:
+            for sid in self.sessions:
+                old = self.ring.node_for(sid)
+                if old != ring.node_for(sid):
+                    moves[old].append(sid)
+                    self.pending[sid] = old
+        self.ring = ring
+        # Let every batch finish, even if a worker dies during another.
+        results = await asyncio.gather(*[
+            self.migrate(self.workers[old], sids)
+            for old, sids in moves.items() ], return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def migrate(self, source, sids):
+        """Move `sids` from `source` to their owners on the ring."""
+        for i in range(0, len(sids), MIGRATE_BATCH):
+            batch = sids[i:i + MIGRATE_BATCH]
+            for sid in batch:
+                self.moving[sid] = asyncio.Event()
+            try:
+                states = await source.request('export', batch)
+                for sid in batch:
+                    self.pending.pop(sid, None)
+                targets = collections.defaultdict(dict)
+                for sid, state in states.items():
+                    targets[self.ring.node_for(sid)][sid] = state
+                await asyncio.gather(*[
+                    self.workers[name].request('import', batch_states)
+                    for name, batch_states in targets.items() ])
+                self.moved += len(states)
+            finally:
+                for sid in batch:
+                    self.moving.pop(sid).set()
+
+    async def new_session(self, sid, seed=None):
+        """Start a game for session `sid`, and return its greeting."""
+        if sid in self.sessions:
+            raise ValueError('session {!r} already exists'.format(sid))
+        self.sessions.add(sid)
+        try:
+            return await self.owner(sid).request('new', sid, seed)
+        except BaseException:
+            self.sessions.discard(sid)
+            raise
+
+    async def do_command(self, sid, words):
+        """Run `words` in the game of session `sid`, and return the output.
+
+        Once the game is finished, the session is forgotten.
+
+        """
+        if sid not in self.sessions:
+            raise KeyError(sid)
+        while sid in self.moving:
+            await self.moving[sid].wait()
+        if sid not in self.sessions:
+            raise ConnectionError('session {!r} died with its worker'
+                                  .format(sid))
+        worker = self.owner(sid)
+        output, finished = await worker.request('command', sid, words)
+        if finished:
+            self.sessions.discard(sid)
+        return output
+
+    async def end_session(self, sid):
+        """Forget session `sid` and its game."""
+        while sid in self.moving:
+            await self.moving[sid].wait()
+        if sid not in self.sessions:
+            return  # its worker died, and took the game with it
+        worker = self.owner(sid)
+        self.sessions.discard(sid)
+        try:
+            await worker.request('end', sid)
+        except ConnectionError:
+            pass  # so did this worker
+
+class ShardedServer(Server):
+    """A `Server` whose games live in the workers of a `Router`.
+
+    The workers are started before the server starts listening, and
+    each session's commands travel to whichever worker owns it, so that
+    players can be spread over several processes.  If a worker dies,
+    its players are told that their game has collapsed, and the router
+    starts another worker in its place.
+
+    """
+    def __init__(self, shards=2, **kwargs):
+        Server.__init__(self, **kwargs)
+        self.shards = shards
+        self.router = Router()
+
+    async def start(self, sock=None):
+        await self.router.start(self.shards)
+        return await Server.start(self, sock)
+
+    async def close(self):
+        await Server.close(self)
+        await self.router.close()
+
+    async def open_session(self, sid, seed):
+        return await self.router.new_session(str(sid), seed)
+
+    async def play(self, sid, words):
+        if not words:
+            return '', False
+        refused = refusal(words)
+        if refused:
+            return refused, False
+        self.total_commands += 1
+        sid = str(sid)
+        if sid not in self.router.sessions:  # lost when its worker died
+            return COLLAPSED, True
+        try:
+            output = await self.router.do_command(sid, words)
+        except RuntimeError:  # the game raised an exception in its worker
+            log.exception('game crashed running %r', words)
+            await self.router.end_session(sid)
+            return COLLAPSED, True
+        except ConnectionError:  # the worker died, and the game with it
+            log.warning('session %s lost with its worker', sid)
+            await self.router.end_session(sid)
+            return COLLAPSED, True
+        return output, sid not in self.router.sessions
+
+    async def close_session(self, sid):
+        sid = str(sid)
+        if sid in self.router.sessions:
+            await self.router.end_session(sid)
+
+if __name__ == '__main__':
+    # Control-C reaches the whole process group; a worker instead stops
+    # when the router hangs up.
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _serve(socket.socket(fileno=int(sys.argv[1])))
@@ -0,0 +1,123 @@
+"""Type Adventure output at a terminal, at the pace of an old modem.
+
+Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
+Apache License, Version 2.0 as detailed in the accompanying README.txt.
+
+"""
+import asyncio
+import re
+import signal
+import sys
+import threading
+
+TICK = 1 / 60.  # how often to type the next few characters
+
+class Terminal(object):
+    """Type output at an old-fashioned baud rate while reading typeahead.
+
+    Output is typed in chunks, one per `TICK`, each holding whatever
+    characters `baud` says have come due; a `baud` of zero types
+    everything at once.  A thread reads input lines into a queue, so
+    commands typed while output is still appearing wait their turn.
+    An interrupt prints the rest of the current output immediately, or
+    ends the game if nothing is being typed.
+
+    """
+    def __init__(self, baud, stdin=None, stdout=None):
+        self.baud = baud
+        self.stdin = sys.stdin if stdin is None else stdin
+        self.stdout = sys.stdout if stdout is None else stdout
+        self.lines = asyncio.Queue()
+        self.is_typing = False
+        self.is_flushing = False
+        self.loop = None
+
+    def start(self):
+        """Start reading input, and catch interrupts, in the running loop."""
+        self.loop = asyncio.get_running_loop()
+        if self.stdin is sys.stdin and sys.stdin.isatty():
+            import readline  # gives input() line editing
+        try:
+            self.loop.add_signal_handler(signal.SIGINT, self.interrupt)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass  # no signal handlers on this platform or thread
+        thread = threading.Thread(target=self.read_lines, daemon=True)
+        thread.start()
+
+    def stop(self):
+        try:
+            self.loop.remove_signal_handler(signal.SIGINT)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass
+
+    def read_lines(self):
+        """Queue each line of input; runs in its own thread."""
+        while True:
+            try:
+                if self.stdin is sys.stdin:
+                    line = input()  # so readline can offer editing
+                else:
+                    line = self.stdin.readline()
+                    if not line:
+                        raise EOFError()
+            except (EOFError, OSError, ValueError):
+                line = None
+            try:
+                self.loop.call_soon_threadsafe(self.lines.put_nowait, line)
+            except RuntimeError:
+                return  # the loop has already finished
+            if line is None:
+                return
+
+    async def readline(self):
+        """Return the next line of input, or None at end of input."""
+        return await self.lines.get()
+
+    def interrupt(self):
+        if self.is_typing:
+            self.is_flushing = True
+        else:
+            self.lines.put_nowait(None)
+
+    def write_now(self, text):
+        self.stdout.write(text)
+        self.stdout.flush()
+
+    async def write(self, text):
+        """Type `text` at our baud rate."""
+        if not self.baud:
+            self.write_now(text)
+            return
+        chars_per_second = self.baud / 9.  # 8 bits + 1 stop bit
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        i = 0
+        self.is_typing = True
+        self.is_flushing = False
+        try:
+            while i < len(text) and not self.is_flushing:
+                elapsed = loop.time() - start
+                j = int(elapsed * chars_per_second)
+                if j > i:  # at low baud, most ticks have nothing due
+                    self.write_now(text[i:j])
+                    i = j
+                await asyncio.sleep(TICK)
+            self.write_now(text[i:])
+        finally:
+            self.is_typing = False
+
+async def play(game, terminal, greeting):
+    """Run `game` at the `terminal`, starting by typing `greeting`."""
+    terminal.start()
+    try:
+        await terminal.write(greeting)
+        while not game.is_finished:
+            terminal.write_now('> ')
+            line = await terminal.readline()
+            if line is None:
+                break
+            words = re.findall(r'\w+', line.lower())
+            if words:
+                await terminal.write(game.do_command(words))
+    finally:
+        terminal.stop()
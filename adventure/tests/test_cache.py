@@ -0,0 +1,92 @@
+"""Test suite.
+
+Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
+Apache License, Version 2.0 as detailed in the accompanying README.txt.
+
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from adventure import cache
+
+DATAPATH = os.path.join(os.path.dirname(cache.__file__), 'advent.dat')
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.datapath = os.path.join(self.tmp, 'advent.dat')
+        shutil.copy(DATAPATH, self.datapath)
+        self.old_cache_home = os.environ.get('XDG_CACHE_HOME')
+        os.environ['XDG_CACHE_HOME'] = os.path.join(self.tmp, 'home')
+
+    def tearDown(self):
+        if self.old_cache_home is None:
+            del os.environ['XDG_CACHE_HOME']
+        else:
+            os.environ['XDG_CACHE_HOME'] = self.old_cache_home
+        shutil.rmtree(self.tmp)
+
+    def key(self):
+        with open(self.datapath, 'rb') as f:
+            return cache.cache_key(f.read())
+
+    def test_snapshot_is_written_next_to_data_file(self):
+        data = cache.load(self.datapath)
+        path = os.path.join(self.tmp, cache.CACHE_NAME)
+        snapshot = cache.read_snapshot(path, self.key())
+        self.assertIsNotNone(snapshot)
+        self.assertEqual(snapshot.rooms[4].short_description,
+                         data.rooms[4].short_description)
+        self.assertEqual(repr(snapshot.vocabulary['eat']), '<Word eat>')
+
+    def test_snapshot_is_used_when_fresh(self):
+        cache.load(self.datapath)
+        path = os.path.join(self.tmp, cache.CACHE_NAME)
+        marked = cache.read_snapshot(path, self.key())
+        marked.marker = True
+        cache.write_snapshot(path, self.key(), marked)
+        self.assertTrue(cache.load(self.datapath).marker)
+
+    def test_changed_data_file_invalidates_snapshot(self):
+        cache.load(self.datapath)
+        old_key = self.key()
+        with open(self.datapath, 'a') as f:
+            f.write('\n')
+        self.assertNotEqual(self.key(), old_key)
+        path = os.path.join(self.tmp, cache.CACHE_NAME)
+        self.assertIsNone(cache.read_snapshot(path, self.key()))
+        cache.load(self.datapath)
+        self.assertIsNotNone(cache.read_snapshot(path, self.key()))
+
+    def test_corrupt_snapshot_is_ignored(self):
+        path = os.path.join(self.tmp, cache.CACHE_NAME)
+        with open(path, 'wb') as f:
+            f.write(cache.MAGIC + self.key() + b'\nnot a pickle')
+        data = cache.load(self.datapath)
+        self.assertEqual(data.hints[4].turns_needed, 4)
+
+    def test_falls_back_to_user_cache_directory(self):
+        os.mkdir(os.path.join(self.tmp, cache.CACHE_NAME))  # unwritable
+        cache.load(self.datapath)
+        path = os.path.join(self.tmp, 'home', 'python-adventure',
+                            cache.CACHE_NAME)
+        self.assertIsNotNone(cache.read_snapshot(path, self.key()))
+
+    def test_lazy_snapshot_reads_text_from_data_file(self):
+        eager = cache.load(self.datapath)
+        cache.load(self.datapath, lazy=True)
+        path = os.path.join(self.tmp, cache.LAZY_CACHE_NAME)
+        with open(self.datapath, 'rb') as f:
+            key = cache.cache_key(f.read(), lazy=True)
+        self.assertNotEqual(key, self.key())
+        lazy = cache.read_snapshot(path, key)
+        self.assertIsNotNone(lazy)
+        self.assertEqual(lazy.source.path, self.datapath)
+        self.assertEqual(lazy.rooms[4].long_description,
+                         eager.rooms[4].long_description)
+        self.assertEqual(lazy.messages[65].text, eager.messages[65].text)
+        self.assertEqual(lazy.objects[24].messages[5],
+                         eager.objects[24].messages[5])
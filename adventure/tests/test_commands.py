@@ -32,3 +32,152 @@ class CommandTest(TestCase):
             game.do_command(['no'])  # WOULD YOU LIKE INSTRUCTIONS?
             game.do_command(['enter'])  # so we are next to lamp
             game.do_command([word, 'lamp'])
+
+class SharedWorldTest(TestCase):
+
+    def setUp(self):
+        self.game1 = Game()
+        load_advent_dat(self.game1)
+        self.game1.start()
+        self.game2 = Game()
+        load_advent_dat(self.game2)
+        self.game2.start()
+
+    def test_games_share_static_world(self):
+        self.assertIs(self.game1.rooms, self.game2.rooms)
+        self.assertIs(self.game1.vocabulary, self.game2.vocabulary)
+        self.assertIs(self.game1.messages, self.game2.messages)
+
+    def test_games_keep_separate_state(self):
+        self.game1.do_command(['no'])
+        self.game1.do_command(['enter'])
+        self.game1.do_command(['get', 'lamp'])
+        self.assertTrue(self.game1.lamp.is_toting)
+        self.assertFalse(self.game2.lamp.is_toting)
+        self.assertIs(self.game2.lamp.rooms[0], self.game2.rooms[3])
+        self.assertEqual(self.game1.times_described, {1: 1, 3: 1})
+        self.assertEqual(self.game2.times_described, {})
+
+class OutputTest(TestCase):
+
+    def setUp(self):
+        self.game = Game()
+        load_advent_dat(self.game)
+        self.game.start()
+        self.game.do_command(['no'])
+
+    def test_dynamic_text_is_upper_cased(self):
+        self.assertEqual(self.game.do_command(['drop', 'rod']),
+                         'I SEE NO ROD HERE.\n\n')
+
+    def test_output_can_be_reset(self):
+        self.game.output = ''
+        self.assertEqual(self.game.output, '')
+        self.game.write('Hello')
+        self.game.speak('WORLD')
+        self.assertEqual(self.game.output, 'HELLO\nWORLD\n')
+
+    def test_stream_command_emits_same_text(self):
+        clone = self.game.clone()
+        segments = []
+        self.game.stream_command(['enter'], segments.append)
+        self.assertGreater(len(segments), 1)
+        self.assertEqual(''.join(segments), clone.do_command(['enter']))
+        self.assertEqual(self.game.output, '')
+
+class BatchTest(TestCase):
+
+    def setUp(self):
+        self.game = Game(1)
+        load_advent_dat(self.game)
+        self.game.start()
+
+    def test_outputs_match_single_commands(self):
+        commands = [['no'], ['enter'], ['get', 'lamp'], ['inventory']]
+        clone = self.game.clone()
+        self.assertEqual(self.game.do_commands(commands),
+                         [ clone.do_command(words) for words in commands ])
+
+    def test_outputs_can_be_iterated(self):
+        outputs = self.game.iter_commands([['no'], ['enter']])
+        self.assertIsNotNone(self.game.yesno_callback)  # not yet answered
+        self.assertIn('END OF A ROAD', next(outputs))
+        self.assertEqual(self.game.turns, 0)
+        self.assertIn('INSIDE A BUILDING', next(outputs))
+        self.assertEqual(self.game.turns, 1)
+
+    def test_finished_game_ignores_further_commands(self):
+        outputs = self.game.do_commands([['no'], ['quit'], ['y'], ['look']])
+        self.assertEqual(len(outputs), 3)
+        self.assertIn('YOU SCORED', outputs[-1])
+        self.assertTrue(self.game.is_finished)
+
+    def test_stop_at_question(self):
+        commands = [['no'], ['quit'], ['y'], ['look']]
+        outputs = self.game.do_commands(commands, stop_at_question=True)
+        self.assertEqual(outputs[-1], 'DO YOU REALLY WANT TO QUIT NOW?\n\n')
+        self.assertEqual(self.game.do_commands([['n']]), ['OK\n\n'])
+        self.assertFalse(self.game.is_finished)
+
+    def test_stop_at_death(self):
+        self.game.do_command(['no'])
+        self.game.loc = self.game.rooms[17]  # dark, beside the fissure
+        outputs = self.game.do_commands([['east'], ['west']] * 20,
+                                        stop_at_death=True)
+        self.assertLess(len(outputs), 40)
+        self.assertIn('GOTTEN YOURSELF KILLED', outputs[-1])
+        self.assertTrue(self.game.is_dead)
+
+class LocationIndexTest(TestCase):
+
+    def setUp(self):
+        self.game = Game(7)
+        load_advent_dat(self.game)
+        self.game.start()
+
+    def assertIndexMatchesObjects(self, game):
+        for room in game.rooms.values():
+            self.assertEqual(
+                [ obj.n for obj in game.objects_at(room) ],
+                [ obj.n for obj in game.object_list if room in obj.rooms ])
+        self.assertEqual(
+            [ obj.n for obj in game.inventory ],
+            [ obj.n for obj in game.object_list if obj.is_toting ])
+
+    def test_index_follows_play(self):
+        for command in ['no', 'enter', 'get lamp', 'get keys', 'get food',
+                        'drop keys', 'leave', 'drop food', 'south']:
+            self.game.do_command(command.split())
+            self.assertIndexMatchesObjects(self.game)
+        self.assertIndexMatchesObjects(self.game.clone())
+
+    def test_index_follows_rooms_assignment(self):
+        game = self.game
+        game.troll2.rooms = [ game.rooms[1], game.rooms[3] ]
+        game.rod2.carry()
+        game.rod.destroy()
+        self.assertIn(game.troll2, game.objects_at(game.rooms[3]))
+        self.assertIndexMatchesObjects(game)
+
+class HintTest(TestCase):
+
+    def setUp(self):
+        self.game = Game(1)
+        load_advent_dat(self.game)
+        self.game.start()
+
+    def play(self, *commands):
+        return [ self.game.do_command(c.split()) for c in commands ][-1]
+
+    def test_leaving_the_room_resets_the_count(self):
+        self.play('no', 'south', 'south', 'south', 'inventory', 'inventory')
+        self.assertEqual(self.game.hints[4].turn_counter, 3)
+        self.play('north')
+        self.assertEqual(self.game.hints[4].turn_counter, 0)
+        self.assertEqual(self.game.hint_streaks, [])
+        output = self.play('south', 'inventory', 'inventory')
+        self.assertNotIn('TRYING TO GET INTO THE CAVE', output)
+        output = self.play('inventory')
+        self.assertIn('TRYING TO GET INTO THE CAVE', output)
+        self.assertIn('THE GRATE IS VERY SOLID', self.play('yes'))
+        self.assertTrue(self.game.hints[4].used)
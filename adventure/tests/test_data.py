@@ -4,6 +4,7 @@ Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
 Apache License, Version 2.0 as detailed in the accompanying README.txt.
 
 """
+import os
 import unittest
 
 class DataTest(unittest.TestCase):
@@ -45,6 +46,25 @@ ENTER WITHOUT A KEY, AND THERE ARE NO KEYS NEARBY.  I WOULD RECOMMEND
 LOOKING ELSEWHERE FOR THE KEYS.
 """)
 
+    def test_lazy_text_matches_eager_text(self):
+        import adventure
+        from adventure.data import Data, DataFile, LazyText, parse
+        lazy = Data()
+        datapath = os.path.join(os.path.dirname(adventure.__file__),
+                                'advent.dat')
+        parse(lazy, DataFile(datapath))
+        self.assertIsInstance(lazy.rooms[4]._long_description, LazyText)
+        for n, room in self.data.rooms.items():
+            self.assertEqual(lazy.rooms[n].long_description,
+                             room.long_description)
+        for n, message in self.data.messages.items():
+            self.assertEqual(lazy.messages[n].text, message.text)
+        for obj in self.data.object_list:
+            messages = lazy.objects[obj.n].messages
+            self.assertEqual(sorted(messages), sorted(obj.messages))
+            for key, text in obj.messages.items():
+                self.assertEqual(messages[key], text)
+
 class ReprTest(unittest.TestCase):
 
     def setUp(self):
@@ -88,3 +108,91 @@ class ReprTest(unittest.TestCase):
 
     def test_word_repr(self):
         self.assertEqual(repr(self.data.vocabulary['eat']), '<Word eat>')
+
+    def test_compiled_routes_match_travel_table(self):
+        travel_words = [ word for word in self.data.vocabulary.values()
+                         if word.kind == 'travel' ]
+        for room in self.data.rooms.values():
+            for word in travel_words:
+                expected = [ move for move in room.travel_table
+                             if move.is_forced or word in move.verbs ]
+                self.assertEqual(list(room.moves_for(word)), expected)
+
+    def test_rooms_know_their_hints(self):
+        self.assertEqual(self.data.rooms[8].hint_ns, (4,))
+        self.assertEqual(self.data.rooms[42].hint_ns, (7,))
+        self.assertEqual(self.data.rooms[1].hint_ns, ())
+
+    def test_dwarf_exits_match_travel_table(self):
+        from adventure.model import Dwarf
+        for room in self.data.rooms.values():
+            expected = { move.action for move in room.travel_table
+                         if Dwarf.can_move(move) and move.action is not room }
+            expected = sorted(expected, key=lambda room: room.n)
+            self.assertEqual(list(room.dwarf_exits), expected)
+
+    def test_words_compare_by_number_and_by_text(self):
+        vocabulary = self.data.vocabulary
+        self.assertEqual(vocabulary['get'], vocabulary['carry'])
+        self.assertNotEqual(vocabulary['get'], vocabulary['drop'])
+        self.assertEqual(vocabulary['carry'], 'get')
+        self.assertNotEqual(vocabulary['carry'], 'drop')
+        self.assertRaises(TypeError, hash, vocabulary['get'])
+
+    def test_words_know_their_spellings(self):
+        vocabulary = self.data.vocabulary
+        self.assertTrue(vocabulary['carry'].is_spelled('get'))
+        self.assertFalse(vocabulary['carry'].is_spelled('drop'))
+
+    def test_objects_compare_by_identity_and_by_name(self):
+        self.assertEqual(self.data.rod, self.data.rod)
+        self.assertNotEqual(self.data.rod, self.data.rod2)
+        self.assertEqual(self.data.rod2, 'rod')
+        self.assertNotEqual(self.data.rod2, 'lamp')
+        self.assertRaises(TypeError, hash, self.data.rod)
+        self.assertTrue(self.data.rod2.is_named('rod'))
+        self.assertFalse(self.data.rod2.is_named('lamp'))
+
+class SlotsTest(unittest.TestCase):
+
+    def setUp(self):
+        from adventure.data import Data
+        from adventure import load_advent_dat
+        self.data = Data()
+        load_advent_dat(self.data)
+
+    def test_model_instances_have_no_dictionary(self):
+        from adventure.model import Dwarf
+        for instance in (self.data.rooms[1], self.data.rooms[1].travel_table[0],
+                         self.data.vocabulary['eat'], self.data.lamp,
+                         self.data.messages[1], self.data.hints[4],
+                         Dwarf(self.data.rooms[19])):
+            self.assertFalse(hasattr(instance, '__dict__'), instance)
+
+    def test_pickled_world_round_trips(self):
+        import pickle
+        data = pickle.loads(pickle.dumps(self.data, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(repr(data.rooms[1].travel_table),
+                         repr(self.data.rooms[1].travel_table))
+        self.assertIs(data.vocabulary['get'].synonyms,
+                      data.vocabulary['carry'].synonyms)
+        self.assertEqual(data.lamp.rooms[0].n, 3)
+        self.assertIsNone(data.lamp.index)
+
+    def test_dictionary_pickled_by_old_version_is_accepted(self):
+        from adventure.model import Hint, Object, Room
+        room = Room.__new__(Room)
+        room.__setstate__({'n': 9, 'short_description': 'HERE\n',
+                           'travel_table': [], 'times_described': 2,
+                           'visited': True})
+        self.assertEqual(room.times_described, 2)
+        self.assertFalse(room.is_light)
+        obj = Object.__new__(Object)
+        obj.__setstate__({'n': 2, 'names': ['lamp'], 'rooms': [room],
+                          'is_toting': False})
+        self.assertEqual(obj.rooms, (room,))
+        self.assertIsNone(obj.index)
+        hint = Hint.__new__(Hint)
+        hint.__setstate__({'n': 4, 'rooms': [room], 'turns_needed': 4})
+        self.assertFalse(hint.used)
+        self.assertEqual(hint.turn_counter, 0)
@@ -0,0 +1,75 @@
+"""Test suite.
+
+Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
+Apache License, Version 2.0 as detailed in the accompanying README.txt.
+
+"""
+import time
+from unittest import IsolatedAsyncioTestCase, TestCase
+from adventure.factory import GameFactory
+from adventure import new_game
+from adventure.server import Client, Server
+
+def draws(game, count=5):
+    return [ game.random_generator.random() for i in range(count) ]
+
+class GameFactoryTest(TestCase):
+
+    def setUp(self):
+        self.factory = GameFactory(size=4).start()
+        self.addCleanup(self.factory.close)
+
+    def wait_until_full(self):
+        deadline = time.monotonic() + 5.0
+        while len(self.factory.ready) < self.factory.size:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.001)
+
+    def test_pool_is_filled_and_refilled(self):
+        self.wait_until_full()
+        games = [ self.factory.new_game() for i in range(3) ]
+        self.assertEqual(self.factory.hits, 3)
+        self.wait_until_full()
+        self.assertEqual(self.factory.built, 7)
+        for game in games:
+            self.assertIn('WOULD YOU LIKE INSTRUCTIONS?', game.output)
+
+    def test_empty_pool_builds_a_game(self):
+        self.factory.close()
+        game = self.factory.new_game()
+        self.assertEqual(self.factory.misses, 1)
+        self.assertIn('END OF A ROAD', game.do_command(['no']))
+
+    def test_seeded_game_plays_like_a_new_one(self):
+        self.wait_until_full()
+        game = self.factory.new_game(seed=5)
+        self.assertEqual(draws(game), draws(new_game(5)))
+
+    def test_unseeded_games_have_their_own_random_streams(self):
+        self.wait_until_full()
+        streams = { tuple(draws(self.factory.new_game())) for i in range(4) }
+        self.assertEqual(len(streams), 4)
+
+    def test_games_built_before_a_fork_are_reseeded(self):
+        self.wait_until_full()
+        pid, game = self.factory.ready[0]
+        state = game.random_generator.getstate()
+        self.factory.ready[0] = (pid + 1, game)  # as if built by our parent
+        self.assertIs(self.factory.new_game(), game)
+        self.assertNotEqual(game.random_generator.getstate(), state)
+
+class FactoryServerTest(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = await Server(seed=1, ready_games=2).start()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def test_players_get_games_from_the_factory(self):
+        client = await Client.connect(port=self.server.port)
+        self.addAsyncCleanup(client.close)
+        self.assertIn('WOULD YOU LIKE INSTRUCTIONS?', client.greeting)
+        self.assertIn('END OF A ROAD', await client.send('no'))
+        stats = self.server.factory.stats()
+        self.assertEqual(stats['hits'] + stats['misses'], 1)
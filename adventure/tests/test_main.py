@@ -0,0 +1,138 @@
+"""Test suite.
+
+Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
+Apache License, Version 2.0 as detailed in the accompanying README.txt.
+
+"""
+import asyncio
+import io
+import os
+import tempfile
+import time
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+from adventure import load_advent_dat
+from adventure.__main__ import parse_args, run_scripts, type_greeting
+from adventure.terminal import Terminal, play
+from adventure.game import Game
+
+class TerminalTest(IsolatedAsyncioTestCase):
+
+    def terminal(self, baud, stdin=''):
+        return Terminal(baud, io.StringIO(stdin), io.StringIO())
+
+    async def test_unlimited_baud_writes_at_once(self):
+        terminal = self.terminal(0)
+        await terminal.write('HELLO\n')
+        self.assertEqual(terminal.stdout.getvalue(), 'HELLO\n')
+
+    async def test_output_is_paced_by_baud_rate(self):
+        terminal = self.terminal(9000)  # 1000 characters per second
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await terminal.write('X' * 100)
+        self.assertGreaterEqual(loop.time() - start, 0.09)
+        self.assertEqual(terminal.stdout.getvalue(), 'X' * 100)
+
+    async def test_low_baud_rate_is_slower_than_a_tick_per_character(self):
+        terminal = self.terminal(180)  # 20 characters per second
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await terminal.write('X' * 6)
+        elapsed = loop.time() - start
+        self.assertGreaterEqual(elapsed, 0.29)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(terminal.stdout.getvalue(), 'X' * 6)
+
+    async def test_interrupt_flushes_the_rest_of_the_output(self):
+        terminal = self.terminal(90)  # 10 characters per second
+        task = asyncio.ensure_future(terminal.write('X' * 1000))
+        await asyncio.sleep(0.05)
+        terminal.interrupt()
+        await asyncio.wait_for(task, 1.0)
+        self.assertEqual(terminal.stdout.getvalue(), 'X' * 1000)
+
+    async def test_typeahead_is_queued(self):
+        game = Game()
+        load_advent_dat(game)
+        game.start()
+        terminal = self.terminal(0, 'no\nenter\nget lamp\n')
+        await play(game, terminal, game.output)
+        output = terminal.stdout.getvalue()
+        self.assertIn('WOULD YOU LIKE INSTRUCTIONS?', output)
+        self.assertIn('SHINY BRASS LAMP', output)
+        self.assertTrue(game.lamp.is_toting)
+
+    async def test_interrupt_at_prompt_ends_the_game(self):
+        game = Game()
+        load_advent_dat(game)
+        game.start()
+        terminal = self.terminal(0)
+        terminal.read_lines = lambda: None  # no input ever arrives
+        task = asyncio.ensure_future(play(game, terminal, ''))
+        await asyncio.sleep(0.01)
+        terminal.interrupt()
+        await asyncio.wait_for(task, 1.0)
+
+class CommandLineTest(TestCase):
+
+    def test_plain_arguments(self):
+        options = parse_args(['mygame', '--baud=300'])
+        self.assertEqual((options.savefile, options.baud), ('mygame', 300))
+        self.assertIsNone(options.scripts)
+
+    def test_script_arguments(self):
+        options = parse_args(['--script', 'a', '--script', '-', '--seed', '7'])
+        self.assertEqual(options.scripts, ['a', '-'])
+        self.assertEqual(options.seed, 7)
+        self.assertIsNone(options.savefile)
+
+    def test_greeting_is_typed_at_the_baud_rate(self):
+        stdout = io.StringIO()
+        start = time.monotonic()
+        type_greeting('X' * 6, 180, stdout)  # 20 characters per second
+        self.assertGreaterEqual(time.monotonic() - start, 0.29)
+        self.assertEqual(stdout.getvalue(), 'X' * 6)
+
+    def test_scripts_run_headlessly(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'lamp.txt')
+            with open(path, 'w') as f:
+                f.write('no\nenter\nget lamp\n')
+            stdout, stderr = io.StringIO(), io.StringIO()
+            status = run_scripts([path, path], 3, None, stdout, stderr)
+            self.assertEqual(status, 0)
+            self.assertEqual(stdout.getvalue().count('> get lamp\nOK\n'), 2)
+            report = stderr.getvalue().splitlines()
+            self.assertEqual(len(report), 2)
+            self.assertTrue(report[0].startswith(
+                path + ': score 32/350 in 2 turns, '))
+
+            transcripts = os.path.join(directory, 'out')
+            run_scripts([path], 3, transcripts, stdout, stderr)
+            with open(os.path.join(transcripts, 'lamp.txt-3.txt')) as f:
+                self.assertTrue(f.read().endswith('> get lamp\nOK\n\n'))
+
+    def test_failing_script_is_reported(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bad.txt')
+            with open(path, 'w') as f:
+                f.write('no\n')
+            stderr = io.StringIO()
+            with patch('adventure.game.Game._do_command',
+                       side_effect=RuntimeError('the cave collapsed')):
+                status = run_scripts([path], 0, None, io.StringIO(), stderr)
+            self.assertEqual(status, 1)
+            self.assertIn(' FAILED\n', stderr.getvalue())
+            self.assertIn('RuntimeError: the cave collapsed', stderr.getvalue())
+
+    def test_wordless_lines_are_skipped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dots.txt')
+            with open(path, 'w') as f:
+                f.write('no\n...\n\nenter\n???\nget lamp\n')
+            stdout, stderr = io.StringIO(), io.StringIO()
+            status = run_scripts([path], 3, None, stdout, stderr)
+            self.assertEqual(status, 0)
+            self.assertIn('> get lamp\nOK\n', stdout.getvalue())
+            self.assertIn(': score 32/350 in 2 turns, ', stderr.getvalue())
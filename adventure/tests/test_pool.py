@@ -0,0 +1,59 @@
+"""Test suite.
+
+Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
+Apache License, Version 2.0 as detailed in the accompanying README.txt.
+
+"""
+import gc
+import os
+import signal
+import socket
+from unittest import TestCase, skipUnless
+from adventure.pool import Pool
+from adventure.server import PROMPT
+
+def read_reply(sock):
+    data = b''
+    while not data.endswith(PROMPT):
+        more = sock.recv(4096)
+        if not more:
+            break
+        data += more
+    return data.decode('ascii')
+
+@skipUnless(hasattr(os, 'fork'), 'worker pools need os.fork()')
+class PoolTest(TestCase):
+
+    def setUp(self):
+        self.pool = Pool(workers=2).start()
+        self.addCleanup(gc.unfreeze)
+        self.addCleanup(self.pool.stop)
+
+    def connect(self):
+        sock = socket.create_connection(('127.0.0.1', self.pool.port), 5)
+        self.addCleanup(sock.close)
+        self.assertIn('WOULD YOU LIKE INSTRUCTIONS?', read_reply(sock))
+        return sock
+
+    def test_workers_play_games(self):
+        self.assertEqual(len(self.pool.pids), 2)
+        sockets = [ self.connect() for i in range(4) ]
+        for sock in sockets:
+            sock.sendall(b'no\r\n')
+            self.assertIn('END OF A ROAD', read_reply(sock))
+
+    def test_dead_worker_is_replaced(self):
+        pid = next(iter(self.pool.pids))
+        os.kill(pid, signal.SIGKILL)
+        self.assertEqual(self.pool.reap(), pid)
+        self.assertNotIn(pid, self.pool.pids)
+        self.assertEqual(len(self.pool.pids), 2)
+        self.assertEqual(self.pool.restarts, 1)
+        self.connect()
+
+    def test_stop_ends_every_worker(self):
+        pids = list(self.pool.pids)
+        self.pool.stop()
+        self.assertEqual(self.pool.pids, {})
+        for pid in pids:
+            self.assertRaises(ChildProcessError, os.waitpid, pid, 0)
@@ -0,0 +1,64 @@
+"""Test suite.
+
+Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
+Apache License, Version 2.0 as detailed in the accompanying README.txt.
+
+"""
+from unittest import TestCase
+from unittest.mock import patch
+from adventure.replay import (format_transcript, parse_script, parse_seeds,
+                              replay, replay_many)
+
+SCRIPT = parse_script("""\
+# Fetch the lamp.
+no
+enter
+
+GET LAMP
+...
+quit
+y
+look
+""".splitlines())
+
+class ReplayTest(TestCase):
+
+    def test_parse_script(self):
+        self.assertEqual(SCRIPT, [['no'], ['enter'], ['get', 'lamp'],
+                                  ['quit'], ['y'], ['look']])
+
+    def test_parse_seeds(self):
+        self.assertEqual(parse_seeds('7'), [7])
+        self.assertEqual(parse_seeds('1,5-7'), [1, 5, 6, 7])
+
+    def test_replay_stops_when_game_is_finished(self):
+        result = replay(SCRIPT, seed=3, script='lamp')
+        self.assertEqual(result.script, 'lamp')
+        self.assertEqual(result.seed, 3)
+        self.assertIsNone(result.error)
+        self.assertEqual(len(result.transcript), 11)  # never ran "look"
+        self.assertEqual(result.transcript[5], 'get lamp')
+        self.assertEqual(result.transcript[6], 'OK\n\n')
+        self.assertEqual((result.score, result.max_score), (36, 350))
+        self.assertEqual(result.turns, 3)
+
+    def test_transcript_formatting(self):
+        text = format_transcript(replay(SCRIPT[:3]).transcript)
+        self.assertTrue(text.startswith('WELCOME TO ADVENTURE!!'))
+        self.assertTrue(text.endswith('> get lamp\nOK\n\n'))
+
+    def test_exception_is_reported(self):
+        with patch('adventure.game.Game._do_command',
+                   side_effect=RuntimeError('the cave collapsed')):
+            result = replay(SCRIPT)
+        self.assertIn('RuntimeError: the cave collapsed', result.error)
+        self.assertEqual(len(result.transcript), 1)
+
+    def test_pool_matches_serial_replay(self):
+        scripts = {'a': SCRIPT, 'b': SCRIPT[:2]}
+        serial = list(replay_many(scripts, range(4), processes=1))
+        pooled = list(replay_many(scripts, range(4), processes=2))
+        self.assertEqual([ (r.script, r.seed) for r in pooled ],
+                         [ (r.script, r.seed) for r in serial ])
+        self.assertEqual([ r.transcript for r in pooled ],
+                         [ r.transcript for r in serial ])
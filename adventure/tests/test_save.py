@@ -0,0 +1,180 @@
+"""Test suite.
+
+Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
+Apache License, Version 2.0 as detailed in the accompanying README.txt.
+
+"""
+import io
+import os
+import pickle
+import zlib
+from unittest import TestCase
+from adventure import load_advent_dat, load_world
+from adventure.game import Game, SAVE_MAGIC
+
+COMMANDS = ['no', 'enter', 'get lamp', 'get keys', 'leave', 'south', 'south',
+            'south', 'unlock grate', 'down', 'west', 'on', 'get cage', 'west',
+            'west', 'get bird', 'drop bird', 'get rod', 'west', 'xyzzy',
+            'xyzzy', 'west', 'down']
+
+def play(game, commands):
+    return [ game.do_command(command.split()) for command in commands ]
+
+def save(game):
+    savefile = io.BytesIO()
+    game.t_suspend('save', savefile)
+    return savefile.getvalue()
+
+class SaveTest(TestCase):
+
+    def setUp(self):
+        self.game = Game(7)
+        load_advent_dat(self.game)
+        self.game.start()
+
+    def test_resumed_game_plays_on_identically(self):
+        play(self.game, COMMANDS[:12])
+        resumed = Game.resume(io.BytesIO(save(self.game)))
+        self.assertEqual(play(resumed, COMMANDS[12:]),
+                         play(self.game, COMMANDS[12:]))
+
+    def test_resumed_game_shares_world(self):
+        play(self.game, COMMANDS[:12])
+        resumed = Game.resume(io.BytesIO(save(self.game)))
+        self.assertIs(resumed.rooms, self.game.rooms)
+        self.assertIsNot(resumed.lamp, self.game.lamp)
+        self.assertIs(resumed.keys.contents, None)
+        self.assertEqual(resumed.times_described, self.game.times_described)
+
+    def test_game_can_be_saved_at_instructions_prompt(self):
+        resumed = pickle.loads(pickle.dumps(self.game))
+        self.assertEqual(play(resumed, COMMANDS[:3]),
+                         play(self.game, COMMANDS[:3]))
+
+    def test_save_holds_only_changeable_state(self):
+        play(self.game, COMMANDS)
+        data = save(self.game)
+        self.assertTrue(data.startswith(SAVE_MAGIC))
+        self.assertLess(len(data), 5000)
+        pickled = zlib.decompress(data[len(SAVE_MAGIC):])
+        self.assertNotIn(b'Room', pickled)
+        self.assertNotIn(b'Word', pickled)
+        self.assertIsInstance(pickle.loads(pickled), Game)
+
+    def test_unknown_format_is_refused(self):
+        state = self.game.__getstate__()
+        state['format'] = 999
+        with self.assertRaises(ValueError):
+            Game.__new__(Game).__setstate__(state)
+
+class LegacySaveTest(TestCase):
+
+    def test_game_saved_by_version_1_6_joins_the_world(self):
+        # Saved by version 1.6 after playing COMMANDS[:12] with seed 7.
+        path = os.path.join(os.path.dirname(__file__), 'saved-1.6.dat')
+        resumed = Game.resume(path)
+        self.assertIs(resumed.world, load_world())
+        self.assertIs(resumed.rooms, load_world().rooms)
+        clone = resumed.clone()
+
+        game = Game(7)
+        load_advent_dat(game)
+        game.start()
+        play(game, COMMANDS[:12])
+        expected = play(game.clone(), COMMANDS[12:])
+        self.assertEqual(play(resumed, COMMANDS[12:]), expected)
+        self.assertEqual(play(clone, COMMANDS[12:]), expected)
+
+class CloneTest(TestCase):
+
+    def setUp(self):
+        self.game = Game(7)
+        load_advent_dat(self.game)
+        self.game.start()
+
+    def test_clone_plays_on_identically(self):
+        play(self.game, COMMANDS[:12])
+        clone = self.game.clone()
+        self.assertEqual(play(clone, COMMANDS[12:]),
+                         play(self.game, COMMANDS[12:]))
+
+    def test_clone_is_independent(self):
+        play(self.game, COMMANDS[:2])
+        clone = self.game.clone()
+        play(clone, ['get lamp'])
+        self.assertTrue(clone.lamp.is_toting)
+        self.assertFalse(self.game.lamp.is_toting)
+        self.assertIsNot(clone.objects['lamp'], self.game.lamp)
+        self.assertIs(clone.objects['lamp'], clone.lamp)
+        self.assertIs(clone.rooms, self.game.rooms)
+
+    def test_clone_answers_pending_instructions_question(self):
+        clone = self.game.clone()
+        self.assertIn('SOMEWHERE NEARBY', clone.do_command(['yes']))
+        self.assertIn('END OF A ROAD', self.game.do_command(['no']))
+        self.assertTrue(clone.hints[3].used)
+        self.assertFalse(self.game.hints[3].used)
+
+    def test_clone_answers_pending_question_for_itself(self):
+        play(self.game, COMMANDS[:1] + ['quit'])
+        clone = self.game.clone()
+        clone.do_command(['yes'])
+        self.assertTrue(clone.is_finished)
+        self.assertFalse(self.game.is_finished)
+        self.assertEqual(self.game.do_command(['no']), 'OK\n\n')
+        self.assertFalse(self.game.is_finished)
+
+class QuestionTest(TestCase):
+    """A game can be saved or cloned while any question awaits an answer."""
+
+    def setUp(self):
+        self.game = Game(7)
+        load_advent_dat(self.game)
+        self.game.start()
+        self.game.do_command(['no'])
+
+    def assertAnswersSurvive(self, game):
+        self.assertIsNotNone(game.yesno_callback)
+        for answer in 'yes', 'no':
+            resumed = Game.resume(io.BytesIO(save(game.clone())))
+            clone = game.clone()
+            self.assertEqual(resumed.do_command([answer]),
+                             clone.do_command([answer]))
+            self.assertEqual(play(resumed, ['look', 'inventory']),
+                             play(clone, ['look', 'inventory']))
+
+    def test_quit(self):
+        play(self.game, ['quit'])
+        self.assertAnswersSurvive(self.game)
+
+    def test_score(self):
+        play(self.game, ['score'])
+        self.assertAnswersSurvive(self.game)
+
+    def test_reincarnation(self):
+        self.game.loc = self.game.rooms[17]  # dark, beside the fissure
+        self.game.do_commands([['east'], ['west']] * 20, stop_at_death=True)
+        self.assertTrue(self.game.is_dead)
+        self.assertAnswersSurvive(self.game)
+
+    def test_dragon(self):
+        self.game.loc = self.game.dragon.rooms[0]
+        play(self.game, ['kill dragon'])
+        self.assertAnswersSurvive(self.game)
+
+    def test_oyster(self):
+        play(self.game, ['enter'])
+        self.game.oyster.carry()
+        play(self.game, ['read oyster'])
+        self.assertAnswersSurvive(self.game)
+
+    def test_hint(self):
+        hint = self.game.hints[4]
+        self.game.yesno(hint.question, 'give_hint', hint.n)
+        self.assertAnswersSurvive(self.game)
+        self.game.do_command(['yes'])
+        self.assertTrue(self.game.hints[4].used)
+
+    def test_unregistered_method_is_refused(self):
+        with self.assertRaises(ValueError):
+            self.game.yesno('SURE?', 'score_and_exit')
@@ -0,0 +1,101 @@
+"""Test suite.
+
+Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
+Apache License, Version 2.0 as detailed in the accompanying README.txt.
+
+"""
+import asyncio
+from unittest import IsolatedAsyncioTestCase, TestCase
+from adventure.server import Client, Server, parse_line
+
+class ParseLineTest(TestCase):
+
+    def test_words_are_lowercased(self):
+        self.assertEqual(parse_line(b'Get LAMP\r\n'), ['get', 'lamp'])
+
+    def test_telnet_negotiation_is_removed(self):
+        line = b'\xff\xfb\x01\xff\xfa\x18\x01\xff\xf0get\xff\xf1 lamp\r\n'
+        self.assertEqual(parse_line(line), ['get', 'lamp'])
+
+class ServerTest(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = await Server(seed=1).start()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def connect(self):
+        client = await Client.connect(port=self.server.port)
+        self.addAsyncCleanup(client.close)
+        return client
+
+    async def test_session_plays_a_game(self):
+        client = await self.connect()
+        self.assertIn('WOULD YOU LIKE INSTRUCTIONS?', client.greeting)
+        reply = await client.send('no')
+        self.assertTrue(reply.startswith('YOU ARE STANDING AT THE END'))
+        reply = await client.send('enter')
+        self.assertIn('SHINY BRASS LAMP', reply)
+        self.assertEqual(await client.send('get lamp'), 'OK')
+        self.assertEqual(await client.send(''), '')
+
+    async def test_sessions_have_separate_games(self):
+        clients = [ await self.connect() for i in range(20) ]
+        replies = await asyncio.gather(*[ c.send('no') for c in clients ])
+        self.assertEqual(len(set(replies)), 1)
+        await clients[0].send('enter')
+        await clients[0].send('get lamp')
+        self.assertIn('LANTERN', await clients[0].send('inventory'))
+        self.assertNotIn('LANTERN', await clients[1].send('inventory'))
+        self.assertEqual(self.server.active_sessions, 20)
+
+    async def test_pipelined_commands_all_get_replies(self):
+        client = await self.connect()
+        client.writer.write(b'no\r\n' + b'look\r\n' * 50)
+        replies = [ await client.read_reply() for i in range(51) ]
+        self.assertIn('I AM NOT ALLOWED', replies[1])
+        self.assertIn('END OF A ROAD', replies[50])
+
+    async def test_saving_is_refused(self):
+        client = await self.connect()
+        await client.send('no')
+        reply = await client.send('save /tmp/anything')
+        self.assertEqual(reply, 'SAVING IS NOT AVAILABLE ON THIS SERVER.')
+
+    async def test_finished_game_hangs_up(self):
+        client = await self.connect()
+        await client.send('no')
+        await client.send('quit')
+        reply = await client.send('yes')
+        self.assertIn('YOU SCORED', reply)
+        self.assertEqual(await client.reader.read(), b'')
+
+    async def test_full_server_turns_players_away(self):
+        self.server.max_sessions = 1
+        await self.connect()
+        client = await self.connect()
+        self.assertEqual(client.greeting,
+                         'THE CAVE IS FULL.  PLEASE TRY AGAIN LATER.')
+
+class SpillingServerTest(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = await Server(seed=1, max_resident=2).start()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def test_idle_games_are_spilled_and_restored(self):
+        clients = [ await Client.connect(port=self.server.port)
+                    for i in range(5) ]
+        for client in clients:
+            self.addAsyncCleanup(client.close)
+            await client.send('no')
+            await client.send('enter')
+        await clients[0].send('get lamp')
+        self.assertLessEqual(len(self.server.games.resident), 2)
+        for client in clients:
+            reply = await client.send('inventory')
+            self.assertEqual('LANTERN' in reply, client is clients[0])
+        self.assertGreater(self.server.games.loads, 0)
@@ -0,0 +1,89 @@
+"""Test suite.
+
+Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
+Apache License, Version 2.0 as detailed in the accompanying README.txt.
+
+"""
+import os
+import zlib
+from unittest import TestCase
+from adventure import new_game
+from adventure.sessions import SessionCache
+
+class SessionCacheTest(TestCase):
+
+    def setUp(self):
+        self.cache = SessionCache(max_resident=3)
+        self.addCleanup(self.cache.close)
+
+    def add_games(self, count):
+        for i in range(count):
+            game = self.cache[i] = new_game(i)
+            game.do_command(['no'])
+
+    def test_least_recently_used_games_are_spilled(self):
+        self.add_games(3)
+        self.cache[0]  # now more recent than 1 and 2
+        self.cache[3] = new_game(3)
+        self.assertEqual(list(self.cache.resident), [2, 0, 3])
+        self.assertEqual(list(self.cache.spilled), [1])
+        self.assertEqual(len(self.cache), 4)
+        self.assertEqual(sorted(self.cache), [0, 1, 2, 3])
+
+    def test_spilled_game_is_restored(self):
+        self.add_games(1)
+        self.cache[0].do_command(['enter'])
+        self.cache[0].do_command(['get', 'lamp'])
+        clone = self.cache[0].clone()
+        for i in range(1, 4):
+            self.cache[i] = new_game(i)
+        path, size = self.cache.spilled[0]
+        self.assertTrue(os.path.exists(path))
+        game = self.cache[0]
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(game.do_command(['inventory']),
+                         clone.do_command(['inventory']))
+        self.assertEqual(game.do_command(['xyzzy']),
+                         clone.do_command(['xyzzy']))
+        stats = self.cache.stats()
+        self.assertEqual(stats['loads'], 1)
+        self.assertEqual(stats['resident'], 3)
+        self.assertEqual(stats['spilled'], 1)
+        self.assertGreater(stats['spilled_bytes'], 0)
+
+    def test_game_awaiting_an_answer_is_spilled(self):
+        self.add_games(3)
+        self.cache[0].do_command(['quit'])
+        self.cache[1]
+        self.cache[2]
+        self.cache[3] = new_game(3)
+        self.assertIn(0, self.cache.spilled)
+        self.assertIn('YOU SCORED', self.cache[0].do_command(['yes']))
+
+    def test_game_that_cannot_be_read_back_stays_spilled(self):
+        self.add_games(4)
+        path, size = self.cache.spilled[0]
+        with open(path, 'wb') as f:
+            f.write(b'not a saved game')
+        with self.assertRaises(zlib.error):
+            self.cache[0]
+        self.assertEqual(self.cache.spilled[0], (path, size))
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(self.cache.stats()['loads'], 0)
+        del self.cache[0]
+        self.assertFalse(os.path.exists(path))
+
+    def test_deleting_removes_the_file(self):
+        self.add_games(4)
+        path, size = self.cache.spilled[0]
+        del self.cache[0]
+        del self.cache[3]
+        self.assertFalse(os.path.exists(path))
+        self.assertNotIn(0, self.cache)
+        with self.assertRaises(KeyError):
+            del self.cache[0]
+
+    def test_close_removes_the_directory(self):
+        self.add_games(5)
+        self.cache.close()
+        self.assertFalse(os.path.exists(self.cache.directory))
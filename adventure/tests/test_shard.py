@@ -0,0 +1,194 @@
+"""Test suite.
+
+Copyright 2010-2015 Brandon Rhodes.  Licensed as free software under the
+Apache License, Version 2.0 as detailed in the accompanying README.txt.
+
+"""
+import asyncio
+import os
+import signal
+from unittest import IsolatedAsyncioTestCase, TestCase, skipUnless
+from adventure.server import Client
+from adventure.shard import HashRing, Router, ShardedServer
+
+KEYS = [ 'session-{}'.format(i) for i in range(2000) ]
+
+class HashRingTest(TestCase):
+
+    def owners(self, ring):
+        return { key: ring.node_for(key) for key in KEYS }
+
+    def test_keys_are_spread_evenly(self):
+        counts = {}
+        for node in self.owners(HashRing(['a', 'b', 'c', 'd'])).values():
+            counts[node] = counts.get(node, 0) + 1
+        self.assertEqual(sorted(counts), ['a', 'b', 'c', 'd'])
+        for count in counts.values():
+            self.assertLess(abs(count - 500), 150)
+
+    def test_adding_a_node_moves_only_its_share(self):
+        ring = HashRing(['a', 'b', 'c', 'd'])
+        before = self.owners(ring)
+        ring.add('e')
+        after = self.owners(ring)
+        moved = [ key for key in KEYS if before[key] != after[key] ]
+        self.assertTrue(all(after[key] == 'e' for key in moved))
+        self.assertLess(len(moved), len(KEYS) * 0.3)
+
+    def test_removing_a_node_moves_only_its_keys(self):
+        ring = HashRing(['a', 'b', 'c'])
+        before = self.owners(ring)
+        ring.remove('b')
+        after = self.owners(ring)
+        for key in KEYS:
+            if before[key] != 'b':
+                self.assertEqual(after[key], before[key])
+            else:
+                self.assertIn(after[key], ('a', 'c'))
+
+@skipUnless(os.name == 'posix', 'workers inherit their socket by number')
+class RouterTest(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.router = await Router().start(workers=2)
+
+    async def asyncTearDown(self):
+        await self.router.close()
+
+    async def start_sessions(self, count):
+        sids = [ 's{}'.format(i) for i in range(count) ]
+        for i, sid in enumerate(sids):
+            await self.router.new_session(sid, seed=i)
+            await self.router.do_command(sid, ['no'])
+            await self.router.do_command(sid, ['enter'])
+        return sids
+
+    async def test_sessions_keep_their_games_through_rebalancing(self):
+        router = self.router
+        sids = await self.start_sessions(60)
+        await router.do_command('s0', ['get', 'lamp'])
+        name = await router.add_worker()
+        self.assertGreater(router.moved, 0)
+        self.assertLess(router.moved, 40)
+        await router.remove_worker('worker-0')
+        self.assertNotIn('worker-0', router.workers)
+        self.assertIn(name, router.workers)
+        outputs = await asyncio.gather(*[
+            router.do_command(sid, ['inventory']) for sid in sids ])
+        self.assertIn('LANTERN', outputs[0])
+        self.assertTrue(all('NOT CARRYING' in o for o in outputs[1:]))
+
+    async def test_commands_during_rebalancing_are_answered(self):
+        router = self.router
+        sids = await self.start_sessions(40)
+        commands = [ router.do_command(sid, ['look']) for sid in sids ]
+        outputs = await asyncio.gather(router.add_worker(), *commands)
+        self.assertTrue(all('INSIDE A BUILDING' in o for o in outputs[1:]))
+
+    async def test_session_awaiting_an_answer_moves_too(self):
+        router = self.router
+        sids = await self.start_sessions(40)
+        for sid in sids:
+            await router.do_command(sid, ['quit'])
+        await router.add_worker()
+        self.assertGreater(router.moved, 0)
+        await router.remove_worker('worker-0')
+        self.assertNotIn('worker-0', router.workers)
+        for sid in sids:
+            self.assertEqual(await router.do_command(sid, ['no']), 'OK\n\n')
+
+    async def test_dead_worker_is_forgotten_and_replaced(self):
+        router = self.router
+        sids = await self.start_sessions(20)
+        dead = router.workers['worker-0']
+        os.kill(dead.process.pid, signal.SIGKILL)
+        await dead.replies
+        self.assertNotIn('worker-0', router.workers)
+        self.assertNotIn('worker-0', router.ring.nodes)
+        lost = set(sids) - router.sessions
+        self.assertTrue(lost)
+        for sid in sids:
+            if sid in lost:
+                with self.assertRaises(KeyError):
+                    await router.do_command(sid, ['look'])
+            else:
+                output = await router.do_command(sid, ['look'])
+                self.assertIn('INSIDE A BUILDING', output)
+        while not router.restarts or router.replacing:
+            await asyncio.sleep(0.05)
+        self.assertEqual(len(router.workers), 2)
+        for sid in lost:
+            await router.new_session(sid)
+            output = await router.do_command(sid, ['no'])
+            self.assertIn('END OF A ROAD', output)
+
+    async def test_request_to_dead_worker_raises(self):
+        router = self.router
+        await self.start_sessions(1)
+        worker = router.owner('s0')
+        os.kill(worker.process.pid, signal.SIGKILL)
+        with self.assertRaises(ConnectionError):
+            await router.do_command('s0', ['look'])
+        with self.assertRaises(ConnectionError):
+            worker.request('ping')
+        await router.end_session('s0')
+
+    async def test_finished_session_is_forgotten(self):
+        router = self.router
+        await self.start_sessions(1)
+        await router.do_command('s0', ['quit'])
+        self.assertIn('YOU SCORED', await router.do_command('s0', ['yes']))
+        self.assertNotIn('s0', router.sessions)
+        with self.assertRaises(KeyError):
+            await router.do_command('s0', ['look'])
+
+@skipUnless(os.name == 'posix', 'workers inherit their socket by number')
+class ShardedServerTest(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = await ShardedServer(shards=2, seed=1).start()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def connect(self):
+        client = await Client.connect(port=self.server.port)
+        self.addAsyncCleanup(client.close)
+        return client
+
+    async def test_sessions_are_played_on_the_workers(self):
+        clients = [ await self.connect() for i in range(10) ]
+        for client in clients:
+            self.assertIn('WOULD YOU LIKE INSTRUCTIONS?', client.greeting)
+            await client.send('no')
+            await client.send('enter')
+        await clients[0].send('get lamp')
+        self.assertEqual(len(self.server.router.sessions), 10)
+        self.assertIn('SAVING IS NOT', await clients[1].send('save'))
+
+        # Starting the server used threads to look up its address, so
+        # this also shows that workers can be added once threads exist.
+        await self.server.router.add_worker()
+        await self.server.router.remove_worker('worker-0')
+        for client in clients:
+            reply = await client.send('inventory')
+            self.assertEqual('LANTERN' in reply, client is clients[0])
+
+    async def test_finished_game_hangs_up_and_is_forgotten(self):
+        client = await self.connect()
+        await client.send('no')
+        await client.send('quit')
+        self.assertIn('YOU SCORED', await client.send('yes'))
+        self.assertEqual(await client.reader.read(), b'')
+        self.assertEqual(self.server.router.sessions, set())
+
+    async def test_game_on_a_dead_worker_collapses(self):
+        client = await self.connect()
+        await client.send('no')
+        sid, = self.server.router.sessions
+        worker = self.server.router.owner(sid)
+        os.kill(worker.process.pid, signal.SIGKILL)
+        await worker.replies
+        self.assertIn('HAS COLLAPSED', await client.send('look'))
+        self.assertEqual(await client.reader.read(), b'')
+        self.assertEqual(self.server.router.sessions, set())
@@ -0,0 +1,66 @@
+"""Measure how many times per second a game in progress can be forked.
+
+Compares Game.clone() with the two older ways of duplicating a game:
+``copy.deepcopy()``, and a round trip through ``t_suspend()`` and
+``Game.resume()``.
+
+    $ python benchmarks/clone.py --seconds 2
+
+"""
+import argparse
+import copy
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adventure import load_advent_dat
+from adventure.game import Game
+
+COMMANDS = ['no', 'enter', 'get lamp', 'get keys', 'leave', 'south', 'south',
+            'south', 'unlock grate', 'down', 'west', 'on', 'get cage']
+
+def suspend_and_resume(game):
+    savefile = io.BytesIO()
+    game.t_suspend('save', savefile)
+    savefile.seek(0)
+    return Game.resume(savefile)
+
+def rate(function, game, seconds):
+    """Return how many times per second `function(game)` can run."""
+    count = 0
+    t0 = time.perf_counter()
+    deadline = t0 + seconds
+    while True:
+        for i in range(100):
+            function(game)
+        count += 100
+        t1 = time.perf_counter()
+        if t1 > deadline:
+            return count / (t1 - t0)
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--seconds', type=float, default=1.0,
+                        help='time spent on each method (default %(default)s)')
+    args = parser.parse_args(argv)
+
+    game = Game(0)
+    load_advent_dat(game)
+    game.start()
+    for command in COMMANDS:
+        game.do_command(command.split())
+
+    methods = [
+        ('Game.clone()', Game.clone),
+        ('copy.deepcopy()', copy.deepcopy),
+        ('t_suspend() + resume()', suspend_and_resume),
+        ]
+    for name, function in methods:
+        print('{:24} {:10.0f} clones/s'.format(
+            name, rate(function, game, args.seconds)))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
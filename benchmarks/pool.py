@@ -0,0 +1,108 @@
+"""Measure how session throughput scales with the workers in a pool.
+
+For each worker count, starts an `adventure.pool.Pool`, and has several
+client processes each run many sessions that play the script from
+`benchmarks/server.py` once and hang up.  Reports sessions and commands
+per second, and how much memory each worker holds privately rather than
+sharing with the others.  Throughput can only grow with workers while
+there are idle cores for them (and for the clients) to run on.
+
+    $ python benchmarks/pool.py --workers 1,2,4 --clients 4
+
+"""
+import argparse
+import asyncio
+import gc
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adventure.pool import Pool
+from adventure.server import Client
+from server import SCRIPT
+
+async def play_sessions(port, sessions, concurrency):
+    """Play `sessions` sessions, `concurrency` at a time; return commands."""
+    remaining = [sessions]
+    commands = [0]
+
+    async def player():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            client = await Client.connect(port=port)
+            try:
+                for command in SCRIPT:
+                    await client.send(command)
+                    commands[0] += 1
+            finally:
+                await client.close()
+
+    await asyncio.gather(*[ player() for i in range(concurrency) ])
+    return commands[0]
+
+def run_client(port, sessions, concurrency, results):
+    results.put(asyncio.run(play_sessions(port, sessions, concurrency)))
+
+def private_kb(pid):
+    """Return the memory of `pid` that no other process shares, in kB."""
+    total = 0
+    with open('/proc/{}/smaps_rollup'.format(pid)) as f:
+        for line in f:
+            if line.startswith(('Private_Clean:', 'Private_Dirty:')):
+                total += int(line.split()[1])
+    return total
+
+def measure(workers, clients, sessions, concurrency):
+    pool = Pool(workers).start()
+    try:
+        results = multiprocessing.Queue()
+        processes = [ multiprocessing.Process(
+            target=run_client,
+            args=(pool.port, sessions, concurrency, results))
+                      for i in range(clients) ]
+        t0 = time.perf_counter()
+        for process in processes:
+            process.start()
+        commands = sum(results.get() for process in processes)
+        elapsed = time.perf_counter() - t0
+        for process in processes:
+            process.join()
+        try:
+            memory = [ private_kb(pid) for pid in pool.pids ]
+        except OSError:
+            memory = None  # not Linux
+    finally:
+        pool.stop()
+        gc.unfreeze()
+    return elapsed, commands, memory
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--workers', default='1,2,4',
+                        help='worker counts to try (default %(default)s)')
+    parser.add_argument('--clients', type=int, default=4,
+                        help='client processes (default %(default)s)')
+    parser.add_argument('--sessions', type=int, default=250,
+                        help='sessions each client plays'
+                        ' (default %(default)s)')
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='sessions each client keeps open at once'
+                        ' (default %(default)s)')
+    args = parser.parse_args(argv)
+
+    print('{} CPUs'.format(os.cpu_count()))
+    print('{:>7} {:>12} {:>12} {:>18}'.format(
+        'workers', 'sessions/s', 'commands/s', 'private kB/worker'))
+    for workers in [ int(w) for w in args.workers.split(',') ]:
+        elapsed, commands, memory = measure(
+            workers, args.clients, args.sessions, args.concurrency)
+        sessions = args.clients * args.sessions
+        print('{:>7} {:>12.0f} {:>12.0f} {:>18}'.format(
+            workers, sessions / elapsed, commands / elapsed,
+            '-' if memory is None else sum(memory) // len(memory)))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
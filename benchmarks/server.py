@@ -0,0 +1,73 @@
+"""Measure how many simultaneous sessions one Adventure server can carry.
+
+Starts a server and N scripted clients in this process, has every client
+play the same short script, and reports command throughput and the
+latency that clients saw between sending a command and receiving its
+reply.  Each session uses two file descriptors, so raise ``ulimit -n``
+before trying thousands of sessions.
+
+    $ python benchmarks/server.py --sessions 1000 --rounds 5
+
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adventure.server import Client, Server
+
+SCRIPT = ['no', 'enter', 'get lamp', 'get keys', 'leave', 'south', 'south',
+          'south', 'unlock grate', 'down', 'west', 'on', 'get cage', 'look',
+          'inventory', 'west', 'west']
+
+async def play(port, rounds, latencies):
+    client = await Client.connect(port=port)
+    try:
+        commands = ['no'] + SCRIPT[1:] * rounds
+        for command in commands:
+            t0 = time.perf_counter()
+            await client.send(command)
+            latencies.append(time.perf_counter() - t0)
+    finally:
+        await client.close()
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+async def run(sessions, rounds):
+    server = await Server(seed=0, max_sessions=sessions).start()
+    latencies = []
+    t0 = time.perf_counter()
+    try:
+        await asyncio.gather(*[ play(server.port, rounds, latencies)
+                                for i in range(sessions) ])
+    finally:
+        elapsed = time.perf_counter() - t0
+        await server.close()
+    return elapsed, latencies
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sessions', type=int, default=200,
+                        help='simultaneous sessions (default %(default)s)')
+    parser.add_argument('--rounds', type=int, default=3,
+                        help='times each session plays the script'
+                        ' (default %(default)s)')
+    args = parser.parse_args(argv)
+
+    elapsed, latencies = asyncio.run(run(args.sessions, args.rounds))
+    n = len(latencies)
+    print('sessions      {}'.format(args.sessions))
+    print('commands      {}'.format(n))
+    print('elapsed       {:.3f} s'.format(elapsed))
+    print('throughput    {:.0f} commands/s'.format(n / elapsed))
+    for label, fraction in ('p50', .5), ('p90', .9), ('p99', .99):
+        print('latency {}   {:.2f} ms'.format(
+            label, 1000 * percentile(latencies, fraction)))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
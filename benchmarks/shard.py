@@ -0,0 +1,102 @@
+"""Measure how sessions move when a sharded router gains a worker.
+
+Starts an `adventure.shard.Router`, opens many sessions and plays a few
+commands in each, then adds one more worker while a crowd of players
+keeps sending commands.  Reports the fraction of sessions that moved,
+how long the rebalance took, and the latency those players saw before
+it, and during it both for sessions that stayed put and for those that
+moved.
+
+    $ python benchmarks/shard.py --workers 4 --sessions 5000
+
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adventure.shard import Router
+from server import SCRIPT, percentile
+
+async def keep_playing(router, sid, latencies, done):
+    """Send `look` for session `sid` over and over until `done` is set."""
+    while not done.is_set():
+        t0 = time.perf_counter()
+        await router.do_command(sid, ['look'])
+        latencies[sid].append(time.perf_counter() - t0)
+
+async def crowd(router, sids, seconds=None, until=None):
+    """Have `sids` keep playing for `seconds`, or until `until` finishes."""
+    latencies = { sid: [] for sid in sids }
+    done = asyncio.Event()
+    players = [ asyncio.ensure_future(keep_playing(router, sid, latencies,
+                                                   done)) for sid in sids ]
+    if until is None:
+        await asyncio.sleep(seconds)
+        result = None
+    else:
+        result = await until
+    done.set()
+    await asyncio.gather(*players)
+    return latencies, result
+
+async def run(workers, sessions, players):
+    router = await Router().start(workers)
+    try:
+        sids = [ 's{}'.format(i) for i in range(sessions) ]
+        for i, sid in enumerate(sids):
+            await router.new_session(sid, seed=i)
+            for command in SCRIPT[:6]:
+                await router.do_command(sid, command.split())
+        crowd_sids = sids[:players]
+
+        before, _ = await crowd(router, crowd_sids, seconds=1.0)
+
+        async def add_worker():
+            t0 = time.perf_counter()
+            await router.add_worker()
+            return time.perf_counter() - t0
+
+        ring = router.ring.copy()
+        during, elapsed = await crowd(router, crowd_sids, until=add_worker())
+        moved = { sid for sid in crowd_sids
+                  if ring.node_for(sid) != router.ring.node_for(sid) }
+        stayed = [ t for sid in crowd_sids if sid not in moved
+                   for t in during[sid] ]
+        moving = [ t for sid in moved for t in during[sid] ]
+        before = [ t for sid in crowd_sids for t in before[sid] ]
+        return router.moved, elapsed, before, stayed, moving
+    finally:
+        await router.close()
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--workers', type=int, default=4,
+                        help='workers before the new one (default %(default)s)')
+    parser.add_argument('--sessions', type=int, default=2000,
+                        help='sessions open (default %(default)s)')
+    parser.add_argument('--players', type=int, default=50,
+                        help='sessions that keep playing throughout'
+                        ' (default %(default)s)')
+    args = parser.parse_args(argv)
+
+    moved, elapsed, before, stayed, moving = asyncio.run(
+        run(args.workers, args.sessions, args.players))
+    print('sessions moved    {} of {} ({:.1%}; ideal {:.1%})'.format(
+        moved, args.sessions, moved / args.sessions, 1 / (args.workers + 1)))
+    print('rebalance took    {:.3f} s'.format(elapsed))
+    for label, latencies in (('before', before), ('stayed', stayed),
+                             ('moved', moving)):
+        if not latencies:
+            continue
+        print('latency {:<7} p50 {:.2f} ms  p99 {:.2f} ms  max {:.2f} ms'
+              '  ({} commands)'.format(
+                  label, 1000 * percentile(latencies, .5),
+                  1000 * percentile(latencies, .99),
+                  1000 * max(latencies), len(latencies)))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
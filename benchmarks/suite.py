@@ -0,0 +1,538 @@
+"""Time the moving parts of Adventure, and compare against a baseline.
+
+Each benchmark reports the median and the minimum of many samples, in
+microseconds for timings or bytes for memory.  Results can be saved as
+JSON and later compared against, flagging anything whose minimum got
+worse by more than the threshold; the minimum is the figure that noise
+from the rest of the machine disturbs least:
+
+    $ python benchmarks/suite.py --save baseline.json
+    ... change the code ...
+    $ python benchmarks/suite.py --compare baseline.json
+
+To measure an older checkout with this same script, point ``--tree`` at
+it; benchmarks of features that the older code lacks report "n/a":
+
+    $ python benchmarks/suite.py --tree ../old-adventure --save old.json
+
+The results file looks like:
+
+    {"format": 1,
+     "python": "3.11.7", "platform": "Linux-...",
+     "results": {"parse": {"unit": "us", "median": 3812.4,
+                           "min": 3755.0, "samples": 50}, ...}}
+
+"""
+import argparse
+import gc
+import importlib.util
+import io
+import json
+import os
+import pickle
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+def tree_option(argv):
+    """Return the checkout that ``--tree`` names, before argparse runs."""
+    for i, arg in enumerate(argv):
+        if arg == '--tree' and i + 1 < len(argv):
+            return argv[i + 1]
+        if arg.startswith('--tree='):
+            return arg[7:]
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.abspath(tree_option(sys.argv[1:])))
+
+# Only what every version of Adventure has is imported here; anything
+# newer is looked up by the benchmarks that need it, with `optional()`.
+
+import adventure
+from adventure import load_advent_dat
+from adventure.data import Data, parse
+from adventure.game import Game
+
+FORMAT = 1
+DATAPATH = os.path.join(os.path.dirname(adventure.__file__), 'advent.dat')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(adventure.__file__)))
+BENCHMARKS = []
+
+class Unavailable(Exception):
+    """Raised by a benchmark whose feature this checkout lacks."""
+
+def optional(module, name=None):
+    """Return `module`, or its attribute `name`, or raise `Unavailable`."""
+    try:
+        value = importlib.import_module(module)
+        if name is not None:
+            value = getattr(value, name)
+    except (ImportError, AttributeError):
+        raise Unavailable(module if name is None else module + '.' + name)
+    return value
+
+def require(obj, name):
+    """Raise `Unavailable` unless `obj` has the attribute `name`."""
+    if not hasattr(obj, name):
+        raise Unavailable('{}.{}'.format(getattr(obj, '__name__', obj), name))
+
+def benchmark(name, unit='us'):
+    """Register a function that returns a list of samples."""
+    def register(function):
+        BENCHMARKS.append((name, unit, function))
+        return function
+    return register
+
+def load_world():
+    """Return the shared world, or None where each game parses its own."""
+    load = getattr(adventure, 'load_world', None)
+    return load and load()
+
+def new_game(seed=0):
+    game = Game(seed)
+    world = load_world()
+    if world is None:
+        load_advent_dat(game)
+    else:
+        game.attach(world)
+    game.start()
+    return game
+
+def copy_game(game):
+    """Return an independent copy of `game`, cheaply where we can."""
+    if hasattr(game, 'clone'):
+        return game.clone()
+    try:
+        return pickle.loads(pickle.dumps(game, pickle.HIGHEST_PROTOCOL))
+    except (pickle.PicklingError, AttributeError, TypeError):
+        raise Unavailable('Game.clone')  # like an old pending question
+
+def play(game, *commands):
+    for command in commands:
+        game.do_command(command.split())
+    return game
+
+def time_each(n, setup, action):
+    """Time `action(setup())` `n` times, leaving `setup()` off the clock."""
+    samples = []
+    for i in range(n):
+        arg = setup()
+        t0 = time.perf_counter()
+        action(arg)
+        samples.append(time.perf_counter() - t0)
+    return [ 1e6 * s for s in samples ]
+
+def time_command(n, game, command):
+    """Time `command` run against fresh copies of `game`."""
+    words = command.split()
+    return time_each(n, lambda: copy_game(game),
+                     lambda clone: clone.do_command(words))
+
+# Loading the world and starting games.
+
+@benchmark('parse')
+def bench_parse(n):
+    with open(DATAPATH) as f:
+        text = f.read()
+    return time_each(max(1, n // 10), lambda: io.StringIO(text),
+                     lambda datafile: parse(Data(), datafile))
+
+def load_lazily(cache):
+    try:
+        return cache.load(DATAPATH, lazy=True)
+    except TypeError:
+        raise Unavailable('adventure.cache.load(lazy=True)')
+
+@benchmark('load_snapshot')
+def bench_load_snapshot(n):
+    cache = optional('adventure.cache')
+    cache.load(DATAPATH)  # make sure a snapshot exists
+    return time_each(max(1, n // 10), lambda: DATAPATH, cache.load)
+
+@benchmark('load_snapshot.lazy')
+def bench_load_lazy_snapshot(n):
+    cache = optional('adventure.cache')
+    load_lazily(cache)
+    return time_each(max(1, n // 10), lambda: DATAPATH,
+                     lambda path: cache.load(path, lazy=True))
+
+@benchmark('new_game')
+def bench_new_game(n):
+    load_world()
+    return time_each(n, lambda: None, lambda arg: new_game())
+
+@benchmark('new_game.pooled')
+def bench_new_game_pooled(n):
+    GameFactory = optional('adventure.factory', 'GameFactory')
+    factory = GameFactory(size=n).start()
+    try:
+        while len(factory.ready) < n:
+            time.sleep(0.01)
+        return time_each(n, lambda: None, lambda arg: factory.new_game())
+    finally:
+        factory.close()
+
+# Starting `python -m adventure` in a fresh process, as a deployment
+# that runs one short-lived process per player would.  The default
+# invocation types at 1200 baud, and imports the asyncio terminal
+# while typing the greeting; `--baud 0` never imports it.
+
+DEFAULT_IMPORTS = 'import adventure.__main__'
+if importlib.util.find_spec('adventure.terminal') is not None:
+    DEFAULT_IMPORTS += ', adventure.terminal'
+
+def run_python(*args):
+    """Run Python on `args`, with no input, and return its stderr."""
+    return subprocess.run(
+        [sys.executable] + list(args), cwd=ROOT, stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True,
+        universal_newlines=True).stderr
+
+def time_to_output(*args):
+    """Start Python on `args` and return how long its first output took."""
+    t0 = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable] + list(args), cwd=ROOT, stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        process.stdout.read(1)
+        return time.perf_counter() - t0
+    finally:
+        process.kill()
+        process.wait()
+        process.stdin.close()
+        process.stdout.close()
+
+def import_times(statement='import adventure.__main__'):
+    """Return (self, cumulative, module) microseconds for each import."""
+    stderr = run_python('-X', 'importtime', '-c', statement)
+    times = []
+    for line in stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            own, cumulative, name = line[12:].split('|')
+            if own.strip().isdigit():
+                times.append((int(own), int(cumulative), name.strip()))
+    return times
+
+def top_level_import_time(statement):
+    """Return the microseconds spent on the imports in `statement`."""
+    return sum(cumulative for own, cumulative, name in import_times(statement)
+               if name in statement.split(' ', 1)[1].split(', '))
+
+@benchmark('startup')
+def bench_startup(n):
+    try:
+        run_python('-m', 'adventure', '--baud', '0')  # warm the caches
+    except subprocess.CalledProcessError:
+        raise Unavailable('--baud')
+    return time_each(max(1, n // 100), lambda: None, lambda arg: run_python(
+        '-m', 'adventure', '--baud', '0'))
+
+@benchmark('startup.default')
+def bench_startup_default(n):
+    # Time to the first character of the greeting, typed at 1200 baud;
+    # up to one terminal tick of that is spent waiting for it to be due.
+    time_to_output('-m', 'adventure')  # warm the caches
+    return [ 1e6 * time_to_output('-m', 'adventure')
+             for i in range(max(1, n // 100)) ]
+
+@benchmark('startup.imports')
+def bench_startup_imports(n):
+    return [ top_level_import_time('import adventure.__main__')
+             for i in range(max(1, n // 100)) ]
+
+@benchmark('startup.imports.default')
+def bench_startup_imports_default(n):
+    return [ top_level_import_time(DEFAULT_IMPORTS)
+             for i in range(max(1, n // 100)) ]
+
+def print_import_times(count=15):
+    """Print the imports that `python -m adventure` spends longest on."""
+    times = sorted(import_times(DEFAULT_IMPORTS), reverse=True)
+    print('{:>10} {:>10}  module'.format('self us', 'total us'))
+    for own, cumulative, name in times[:count]:
+        print('{:>10} {:>10}  {}'.format(own, cumulative, name))
+
+# Turns, broken down by the kind of command.
+
+@benchmark('turn.motion')
+def bench_motion(n):
+    return time_command(n, play(new_game(), 'no'), 'east')
+
+@benchmark('turn.transitive')
+def bench_transitive(n):
+    return time_command(n, play(new_game(), 'no', 'enter'), 'get lamp')
+
+@benchmark('turn.intransitive')
+def bench_intransitive(n):
+    game = play(new_game(), 'no', 'enter', 'get lamp', 'get keys')
+    return time_command(n, game, 'inventory')
+
+@benchmark('turn.yesno')
+def bench_yesno(n):
+    return time_command(n, play(new_game(), 'no', 'quit'), 'no')
+
+def crowded_room():
+    """Return a game in the building with every portable object dropped."""
+    game = play(new_game(), 'no', 'enter')
+    for obj in game.object_list:
+        if len(obj.rooms) == 1 and not obj.is_fixed:
+            obj.drop(game.loc)
+    return game
+
+@benchmark('turn.crowded')
+def bench_crowded(n):
+    return time_command(n, crowded_room(), 'look')
+
+# The same walk, one do_command() at a time and as a single batch.
+
+WALK = [ c.split() for c in ['enter', 'get lamp', 'leave', 'south', 'south',
+                             'south', 'north', 'north', 'north', 'look'] ]
+
+@benchmark('walk.loop')
+def bench_walk_loop(n):
+    game = play(new_game(), 'no')
+    return time_each(n, lambda: copy_game(game), lambda clone: [
+        clone.do_command(words) for words in WALK ])
+
+@benchmark('walk.batch')
+def bench_walk_batch(n):
+    require(Game, 'do_commands')
+    game = play(new_game(), 'no')
+    return time_each(n, lambda: copy_game(game),
+                     lambda clone: clone.do_commands(WALK))
+
+@benchmark('move_dwarves')
+def bench_move_dwarves(n):
+    game = play(new_game(), 'no', 'enter', 'get lamp', 'leave', 'south',
+                'south', 'south', 'unlock grate', 'down', 'west', 'on',
+                'get cage', 'west', 'west', 'get bird', 'east', 'east')
+    game.dwarf_stage = 2
+    def setup():
+        clone = copy_game(game)
+        clone.output = ''
+        return clone
+    return time_each(n, setup, Game.move_dwarves)
+
+@benchmark('clone')
+def bench_clone(n):
+    require(Game, 'clone')
+    game = play(new_game(), 'no', 'enter', 'get lamp')
+    return time_each(n, lambda: game, Game.clone)
+
+# Saving and restoring.
+
+def saved_game():
+    game = play(new_game(), 'no', 'enter', 'get lamp', 'leave', 'south')
+    savefile = io.BytesIO()
+    game.t_suspend('save', savefile)
+    return game, savefile.getvalue()
+
+@benchmark('suspend')
+def bench_suspend(n):
+    game, data = saved_game()
+    return time_each(n, io.BytesIO, lambda f: game.t_suspend('save', f))
+
+@benchmark('resume')
+def bench_resume(n):
+    game, data = saved_game()
+    return time_each(n, lambda: io.BytesIO(data), Game.resume)
+
+# Memory.
+
+@benchmark('memory.game', unit='bytes')
+def bench_memory_per_game(n):
+    load_world()
+    gc.collect()
+    count = 100
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        games = [ play(new_game(i), 'no', 'enter', 'get lamp')
+                  for i in range(count) ]
+        gc.collect()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return [ (after - before) / count ]
+
+@benchmark('memory.game.spilled', unit='bytes')
+def bench_memory_per_spilled_game(n):
+    SessionCache = optional('adventure.sessions', 'SessionCache')
+    load_world()
+    gc.collect()
+    count = 1000
+    games = SessionCache(max_resident=10)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(count):
+            games[i] = play(new_game(i), 'no', 'enter', 'get lamp')
+        gc.collect()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        games.close()
+    return [ (after - before) / count ]
+
+@benchmark('sessions.reload')
+def bench_sessions_reload(n):
+    SessionCache = optional('adventure.sessions', 'SessionCache')
+    games = SessionCache(max_resident=1)
+    try:
+        games[0] = play(new_game(), 'no', 'enter', 'get lamp')
+        games[1] = new_game()
+        def setup():
+            games[1]  # which spills game 0
+            return 0
+        return time_each(n, setup, games.__getitem__)
+    finally:
+        games.close()
+
+def peak_allocation(n, game, command):
+    """Return the peak bytes allocated running `command` on clones of `game`."""
+    words = command.split()
+    clones = [ copy_game(game) for i in range(min(n, 100)) ]
+    scalars = getattr(importlib.import_module(Game.__module__),
+                      'SAVED_SCALARS', ())
+    for clone in clones:
+        # Settle class defaults into the instance dictionary up front,
+        # so the one-time cost of growing it does not swamp the turn.
+        clone.__dict__.update((name, getattr(clone, name))
+                              for name in scalars)
+    samples = []
+    tracemalloc.start()
+    try:
+        for clone in clones:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            clone.do_command(words)
+            samples.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return samples
+
+@benchmark('alloc.turn.motion', unit='bytes')
+def bench_alloc_motion(n):
+    return peak_allocation(n, play(new_game(), 'no'), 'east')
+
+@benchmark('alloc.turn.crowded', unit='bytes')
+def bench_alloc_crowded(n):
+    return peak_allocation(n, crowded_room(), 'look')
+
+def world_memory(lazy):
+    cache = optional('adventure.cache')
+    load = load_lazily if lazy else lambda cache: cache.load(DATAPATH)
+    load(cache)  # make sure a snapshot exists
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        world = load(cache)
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return [ after - before ]
+
+@benchmark('memory.world', unit='bytes')
+def bench_memory_world(n):
+    return world_memory(lazy=False)
+
+@benchmark('memory.world.lazy', unit='bytes')
+def bench_memory_lazy_world(n):
+    return world_memory(lazy=True)
+
+# Running, saving, and comparing.
+
+def run(names, n):
+    results = {}
+    for name, unit, function in BENCHMARKS:
+        if names and not any(part in name for part in names):
+            continue
+        gc.collect()
+        try:
+            samples = function(n)
+        except Unavailable as e:
+            print('{:24} {:>12} {:5} (needs {})'.format(name, 'n/a', '', e))
+            continue
+        results[name] = {
+            'unit': unit,
+            'median': statistics.median(samples),
+            'min': min(samples),
+            'samples': len(samples),
+            }
+        print('{:24} {:>12.1f} {:5} (min {:.1f}, {} samples)'.format(
+            name, results[name]['median'], unit, results[name]['min'],
+            len(samples)))
+    return results
+
+def compare(results, baseline, threshold):
+    """Print how `results` differ from `baseline`; return the regressions."""
+    regressions = []
+    print()
+    print('{:24} {:>12} {:>12} {:>8}'.format(
+        'benchmark', 'baseline', 'now', 'change'))
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None or old['unit'] != result['unit'] or not old['min']:
+            continue
+        change = result['min'] / old['min'] - 1.0
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print('{:24} {:>12.1f} {:>12.1f} {:>+7.1%}{}'.format(
+            name, old['min'], result['min'], change, flag))
+    return regressions
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('names', nargs='*',
+                        help='only run benchmarks whose names contain these')
+    parser.add_argument('-n', type=int, default=1000,
+                        help='samples per benchmark (default %(default)s)')
+    parser.add_argument('--save', metavar='FILE',
+                        help='write the results to this JSON file')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='flag regressions against this results file')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='fractional slowdown that counts as a'
+                        ' regression (default %(default)s)')
+    parser.add_argument('--tree', metavar='DIRECTORY',
+                        help='benchmark the Adventure checkout in DIRECTORY'
+                        ' instead of the one holding this script')
+    parser.add_argument('--imports', action='store_true',
+                        help='list the slowest imports at startup and exit')
+    args = parser.parse_args(argv)
+
+    if args.imports:
+        print_import_times()
+        return 0
+
+    results = run(args.names, args.n)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'format': FORMAT,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': results,
+                }, f, indent=1, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print('\n{} regression(s): {}'.format(
+                len(regressions), ', '.join(regressions)))
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
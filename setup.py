@@ -1,6 +1,11 @@
 import os
+import re
 import sys
-from distutils.core import setup
+
+try:
+    from setuptools import setup
+except ImportError:
+    from distutils.core import setup
 
 if sys.version_info < (3,):
     print('\nSorry, but Adventure can only be installed under Python 3.\n')
@@ -10,16 +15,22 @@ README_PATH = os.path.join(os.path.dirname(__file__), 'adventure', 'README.txt')
 with open(README_PATH, encoding="utf-8") as f:
     README_TEXT = f.read()
 
+# The version is kept in one place, adventure/__init__.py.
+INIT_PATH = os.path.join(os.path.dirname(__file__), 'adventure', '__init__.py')
+with open(INIT_PATH, encoding="utf-8") as f:
+    VERSION = re.search(r"^__version__ = '([^']+)'", f.read(), re.M).group(1)
+
 setup(
     name='adventure',
-    version='1.6',
+    version=VERSION,
     description='Colossal Cave adventure game at the Python prompt',
     long_description=README_TEXT,
     author='Brandon Craig Rhodes',
     author_email='brandon@rhodesmill.org',
     url='https://github.com/brandon-rhodes/python-adventure',
     packages=['adventure', 'adventure/tests'],
-    package_data={'adventure': ['README.txt', '*.dat', 'tests/*.txt']},
+    package_data={'adventure': ['README.txt', '*.dat', 'tests/*.txt',
+                              'tests/*.dat']},
     classifiers=[
         'Development Status :: 6 - Mature',
         'Environment :: Console',